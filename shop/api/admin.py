@@ -1,3 +1,17 @@
 from django.contrib import admin
 
-# Register your models here.
+from api.models import IdempotencyKey
+
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = (
+        'id',
+        'user',
+        'key',
+        'status_code',
+        'created_at',
+        )
+
+    search_fields = ('user__email', 'key')
+    readonly_fields = ('fingerprint', 'status_code', 'response', 'created_at')
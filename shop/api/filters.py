@@ -0,0 +1,27 @@
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+
+from products.catalog import Catalog
+
+
+class CatalogFilterBackend(filters.BaseFilterBackend):
+    """
+    Filters products by the query string of `products.catalog`.
+
+    `CursorPagination` picks up `get_ordering`, so `?sort=` changes the
+    ordering the cursors are built on.
+    """
+
+    def get_catalog(self, request):
+        catalog = Catalog(request.query_params)
+
+        if catalog.errors:
+            raise ValidationError(catalog.errors)
+
+        return catalog
+
+    def filter_queryset(self, request, queryset, view):
+        return self.get_catalog(request).filter(queryset)
+
+    def get_ordering(self, request, queryset, view):
+        return self.get_catalog(request).get_ordering()
@@ -0,0 +1,127 @@
+import datetime
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from api.models import IdempotencyKey
+
+header = 'Idempotency-Key'
+
+
+class IdempotencyConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'A request with this Idempotency-Key is still in progress.'
+    default_code = 'idempotency_conflict'
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = 'This Idempotency-Key was already used for another request.'
+    default_code = 'idempotency_key_reused'
+
+
+def get_fingerprint(request):
+    body = json.dumps(request.data, cls=JSONEncoder, sort_keys=True)
+
+    return hashlib.sha256(f'{request.method} {request.path}\n{body}'.encode()).hexdigest()
+
+
+def expired_before():
+    return timezone.now() - datetime.timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+
+
+def claim(user, key, fingerprint):
+    """
+    Inserts the key of a new request, or returns the stored one of a retry.
+
+    The insert takes the unique index, so of concurrent requests with the
+    same key only the first runs, the others wait for its transaction and
+    then replay its response.
+    """
+
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                IdempotencyKey.objects.create(
+                    user=user, key=key, fingerprint=fingerprint, status_code=0, response=None)
+            return None
+
+        except IntegrityError:
+            record = IdempotencyKey.objects.filter(user=user, key=key).first()
+
+            if record is None:
+                # Rolled back by its request meanwhile
+                continue
+
+            if record.created_at < expired_before():
+                record.delete()
+                continue
+
+            return record
+
+    raise IdempotencyConflict()
+
+
+def idempotent(required=False):
+    """
+    Makes a viewset action safe to retry with an `Idempotency-Key` header.
+
+    The action and the stored response share one transaction, so a retry
+    either replays the first response or, when the first request failed,
+    runs again. Only successful responses are stored.
+    """
+
+    def decorator(action):
+        @functools.wraps(action)
+        def wrapper(self, request, *args, **kwargs):
+            key = request.headers.get(header)
+
+            if not key:
+                if required:
+                    raise ValidationError({header: 'This header is required.'})
+
+                return action(self, request, *args, **kwargs)
+
+            if len(key) > 255:
+                raise ValidationError({header: 'Ensure this header has no more than 255 characters.'})
+
+            fingerprint = get_fingerprint(request)
+
+            with transaction.atomic():
+                record = claim(request.user, key, fingerprint)
+
+                if record is not None:
+                    if record.fingerprint != fingerprint:
+                        raise IdempotencyKeyReused()
+
+                    if not record.status_code:
+                        raise IdempotencyConflict()
+
+                    response = Response(record.response, status=record.status_code)
+                    response['Idempotent-Replayed'] = 'true'
+                    return response
+
+                response = action(self, request, *args, **kwargs)
+
+                if status.is_success(response.status_code):
+                    IdempotencyKey.objects.filter(user=request.user, key=key).update(
+                        status_code=response.status_code,
+                        response=json.loads(json.dumps(response.data, cls=JSONEncoder)),
+                    )
+                else:
+                    # Nothing happened, the client may retry with the same key
+                    transaction.set_rollback(True)
+
+            return response
+
+        return wrapper
+
+    return decorator
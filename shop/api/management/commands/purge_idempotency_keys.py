@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from api.idempotency import expired_before
+from api.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Deletes the Idempotency-Key responses older than IDEMPOTENCY_KEY_TTL, run it periodically e.g. from cron'
+
+    def handle(self, *args, **options):
+        deleted, _ = IdempotencyKey.objects.filter(created_at__lt=expired_before()).delete()
+
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired idempotency keys.'))
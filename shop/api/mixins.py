@@ -0,0 +1,43 @@
+from django.db.models import Count, Max
+
+from products.cache import get_validators, not_modified, set_validators
+
+
+class ConditionalGetMixin:
+    """
+    Conditional GETs for the list and retrieve actions of a viewset.
+
+    The ETag and Last-Modified headers come from one aggregate over the
+    filtered queryset, by default the latest `updated_at` and the row count,
+    so a 304 is answered without running the serializers.
+    """
+
+    def get_conditional_aggregates(self):
+        return {'updated_at': Max('updated_at'), 'count': Count('pk', distinct=True)}
+
+    def conditional(self, queryset, action, request, *args, **kwargs):
+        values = queryset.order_by().aggregate(**self.get_conditional_aggregates())
+
+        if not values['count']:
+            return action(request, *args, **kwargs)
+
+        etag, last_modified = get_validators(
+            request.accepted_renderer.format, *[values[name] for name in sorted(values)])
+
+        return not_modified(request, etag, last_modified) or set_validators(
+            action(request, *args, **kwargs), etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(
+            self.filter_queryset(self.get_queryset()),
+            super(ConditionalGetMixin, self).list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+
+        return self.conditional(
+            self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}),
+            super(ConditionalGetMixin, self).retrieve, request, *args, **kwargs
+        )
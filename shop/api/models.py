@@ -1,3 +1,30 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class IdempotencyKey(models.Model):
+    """
+    The response of a mutating API request sent with an `Idempotency-Key`
+    header, replayed when the client retries it, see `api.idempotency`.
+    """
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    # Hash of the method, path and body, a key can't be reused for another request
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField()
+    # Empty until the request completes
+    response = models.JSONField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotencykey_unique_user_key'),
+        ]
+        indexes = [
+            # Backs the purge of expired keys
+            models.Index(fields=['created_at'], name='idempotencykey_created_at_idx'),
+        ]
+
+    def __str__(self):
+        return ' | '.join((str(self.user), self.key, str(self.status_code)))
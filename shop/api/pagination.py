@@ -0,0 +1,39 @@
+from django.conf import settings
+from rest_framework import pagination
+
+
+class CursorPagination(pagination.CursorPagination):
+    """
+    Cursor pagination for every viewset of the API.
+
+    The ordering is taken from the `ordering` attribute of the viewset so that
+    each endpoint pages over a stable, indexed ordering. The next and previous
+    cursors are also sent as a `Link` header for incremental syncs.
+    """
+
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+    ordering = '-pk'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'ordering', None)
+
+        if ordering:
+            self.ordering = ordering
+
+        return super(CursorPagination, self).get_ordering(request, queryset, view)
+
+    def get_paginated_response(self, data):
+        response = super(CursorPagination, self).get_paginated_response(data)
+
+        links = [
+            f'<{url}>; rel="{rel}"' for url, rel in (
+                (self.get_next_link(), 'next'),
+                (self.get_previous_link(), 'prev'),
+            ) if url
+        ]
+
+        if links:
+            response['Link'] = ', '.join(links)
+
+        return response
@@ -1,5 +1,8 @@
+from django.db.models import BooleanField, Q, Value
 from rest_framework import permissions
 
+from carts.models import Cart, CartItem, Order
+
 
 class IsProductOwnerOrReadOnly(permissions.BasePermission):
     """
@@ -29,36 +32,50 @@ class IsOrderRelated(permissions.BasePermission):
     """
     Custom permission to only allow related users to Carts, CartItems and Orders
     view them.
+
+    Uses the `is_order_related` annotation added by the viewsets when present,
+    otherwise answers with a single EXISTS query.
     """
 
     def has_object_permission(self, request, view, obj):
-        view = view.__class__.__name__
+        related = getattr(obj, 'is_order_related', None)
 
-        if view == 'CartViewset':
-            if obj.owner == request.user:
-                return True
+        if related is not None:
+            return related
 
-            for cartitem in obj.cartitems.all():
-                if cartitem.product.owner.owner == request.user:
-                    return True
+        model = type(obj)
 
+        if model not in order_relations:
             return False
 
-        elif view == 'CartItemViewset':
-            if obj.product.owner.owner == request.user:
-                return True
+        return model._default_manager.filter(
+            order_relations[model](request.user), pk=obj.pk
+        ).exists()
 
-            return False
 
-        elif view == 'OrderViewset':
-            if obj.cart.owner == request.user:
-                return True
+def carts_sold_by(user):
+    """Subquery of the carts which contain a product sold by `user`"""
 
-            for cartitem in obj.cart.cartitems.all():
-                if cartitem.product.owner.owner == request.user:
-                    return True
+    return CartItem.objects.filter(product__owner__owner=user).values('cart')
 
-            return False
 
-        else:
-            return False
+# Conditions matching the objects a user bought or sells in, keyed by model.
+# Carts are the union of two indexed lookups (owned carts and carts holding
+# the user's products) rather than an OR over a join, so no DISTINCT is needed.
+order_relations = {
+    Cart: lambda user: Q(owner=user) | Q(pk__in=carts_sold_by(user)),
+    CartItem: lambda user: Q(product__owner__owner=user),
+    Order: lambda user: Q(cart__in=Cart.objects.filter(
+        order_relations[Cart](user)).values('pk')),
+}
+
+
+def filter_order_related(queryset, user):
+    """
+    Scopes a Cart, CartItem or Order queryset to the objects related to `user`.
+    Every row left is related, so `is_order_related` is annotated as a constant.
+    """
+
+    return queryset.filter(order_relations[queryset.model](user)).annotate(
+        is_order_related=Value(True, output_field=BooleanField()))
+
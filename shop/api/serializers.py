@@ -1,8 +1,61 @@
+from decimal import Decimal
+
 from rest_framework import serializers
+from rest_framework.reverse import reverse
 
 from products.models import Product
 from associates.models import Associate
 from carts.models import Cart, CartItem, Order
+from carts.services import max_line_quantity
+from products import counters
+from products.images import formats
+
+
+class ImageVariantsField(serializers.Field):
+    """
+    Read only URLs of the resized copies of an image, by format and width,
+    see `products.images`. Empty until they are generated.
+    """
+
+    def __init__(self, image_field='logo', **kwargs):
+        self.image_field = image_field
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super(ImageVariantsField, self).__init__(**kwargs)
+
+    def to_representation(self, instance):
+        image = getattr(instance, self.image_field)
+        variants = getattr(instance, f'{self.image_field}_variants')
+        request = self.context.get('request')
+
+        def url(name):
+            url = image.storage.url(name)
+            return request.build_absolute_uri(url) if request is not None else url
+
+        return {
+            name: {width: url(path) for width, path in variants[name].items()}
+            for name in formats if name in variants
+        }
+
+
+class SalesField(serializers.Field):
+    """
+    Read only sales of an instance including the counter shards not compacted
+    yet, see `products.counters`. Uses the `total_sales` annotation when present.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super(SalesField, self).__init__(**kwargs)
+
+    def to_representation(self, instance):
+        total = getattr(instance, 'total_sales', None)
+
+        if total is None:
+            total = counters.get_sales(type(instance), [instance.pk])[instance.pk]
+
+        return total
 
 
 class AssociateSerializer(serializers.HyperlinkedModelSerializer):
@@ -11,11 +64,12 @@ class AssociateSerializer(serializers.HyperlinkedModelSerializer):
     url = serializers.HyperlinkedIdentityField(
         view_name='api:associate-detail', lookup_field='slug')
     owner = serializers.ReadOnlyField(source='owner.email')
+    logo_variants = ImageVariantsField()
 
     class Meta:
         model = Associate
         fields = ['url', 'name', 'description',
-                  'owner', 'logo', 'website',
+                  'owner', 'logo', 'logo_variants', 'website',
                   'location', 'products']
         extra_kwargs = {
             'name': {'read_only': True},
@@ -30,16 +84,15 @@ class ProductSerializer(serializers.HyperlinkedModelSerializer):
         read_only=True
     )
     url = serializers.HyperlinkedIdentityField(view_name='api:product-detail',)
+    logo_variants = ImageVariantsField()
+    sales = SalesField()
 
     class Meta:
         model = Product
         fields = ['url', 'id', 'name',
-                  'description', 'logo',
+                  'description', 'logo', 'logo_variants',
                   'price', 'sales', 'count',
                   'owner', 'category', 'holding']
-        extra_kwargs = {
-            'sales': {'read_only': True},
-        }
 
 
 class CartSerializer(serializers.HyperlinkedModelSerializer):
@@ -56,17 +109,104 @@ class CartSerializer(serializers.HyperlinkedModelSerializer):
         }
 
     def get_cartitems(self, obj):
+        """
+        Returns the urls of the items of the cart sold by the user.
+        Uses the `sold_cartitems` prefetched by the viewsets when present.
+        """
 
         request = self.context.get('request')
 
-        filtered_cartitems = CartItem.objects.filter(
-            cart=obj,
-            product__owner__owner=request.user
-        )
+        filtered_cartitems = getattr(obj, 'sold_cartitems', None)
+
+        if filtered_cartitems is None:
+            filtered_cartitems = CartItem.objects.filter(
+                cart=obj,
+                product__owner__owner=request.user
+            ).only('pk')
+
+        return [
+            reverse('api:cartitem-detail', args=[item.pk], request=request)
+            for item in filtered_cartitems
+        ]
+
+
+class CartLineSerializer(serializers.Serializer):
+    """
+    The quantity of one product of a cart, 0 removes it. Plain ids rather than
+    related fields, `carts.services.set_cart_lines` checks the products at once.
+    """
+
+    product = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=0, max_value=max_line_quantity)
+
+
+class CartLinesSerializer(serializers.ListSerializer):
+    child = CartLineSerializer()
 
-        return [CartItemSerializer(
-            item, read_only=True, context={'request': request}
-        ).data['url'] for item in filtered_cartitems]
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('max_length', 1000)
+        super(CartLinesSerializer, self).__init__(*args, **kwargs)
+
+    def validate(self, attrs):
+        products = [line['product'] for line in attrs]
+
+        if len(set(products)) != len(products):
+            raise serializers.ValidationError('Every product can only be listed once.')
+
+        return attrs
+
+
+class CartProductSerializer(serializers.Serializer):
+    product = serializers.IntegerField(min_value=1)
+
+
+class CurrentCartLineSerializer(serializers.Serializer):
+    product = serializers.IntegerField()
+    name = serializers.CharField(source='product__name')
+    price = serializers.DecimalField(source='product__price', max_digits=12, decimal_places=2)
+    quantity = serializers.IntegerField()
+
+
+class CurrentCartSerializer(serializers.Serializer):
+    """
+    Lean representation of the active cart for headless clients, plain ids and
+    values read with one query instead of hyperlinked and nested products.
+    """
+
+    id = serializers.IntegerField()
+    count = serializers.IntegerField()
+    total = serializers.DecimalField(max_digits=12, decimal_places=2)
+    lines = CurrentCartLineSerializer(many=True)
+
+    @classmethod
+    def for_cart(cls, cart, **kwargs):
+        lines = list(CartItem.objects.filter(cart=cart).order_by('pk').values(
+            'product', 'product__name', 'product__price', 'quantity'))
+
+        for line in lines:
+            # Prices are stored as floats, money is added up in Decimal
+            line['product__price'] = Decimal(str(line['product__price'])).quantize(Decimal('0.01'))
+
+        return cls({
+            'id': cart.pk,
+            'count': sum(line['quantity'] for line in lines),
+            'total': sum((line['quantity'] * line['product__price'] for line in lines), Decimal(0)),
+            'lines': lines,
+        }, **kwargs)
+
+
+class CheckoutSerializer(serializers.ModelSerializer):
+    """The delivery details of a checkout, required like on `carts.forms.OrderCreateForm`"""
+
+    class Meta:
+        model = Order
+        fields = ['id', 'status', 'address', 'phone', 'postal_code', 'delivery_method']
+        read_only_fields = ['id', 'status']
+        extra_kwargs = {
+            'address': {'required': True, 'allow_blank': False},
+            'phone': {'required': True, 'allow_blank': False},
+            'postal_code': {'required': True, 'allow_blank': False},
+        }
 
 
 class CartItemSerializer(serializers.HyperlinkedModelSerializer):
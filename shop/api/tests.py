@@ -1,5 +1,10 @@
 import tempfile
 from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
@@ -7,8 +12,12 @@ from rest_framework import status
 from rest_framework.test import APITestCase
 
 from associates.models import Associate
+from products import counters
 from products.models import Product
+from products.engine import catalog_index, catalog_suggestions
 from carts.models import Cart, CartItem, Order
+from api.pagination import CursorPagination
+from api.permissions import IsOrderRelated, filter_order_related
 
 User = get_user_model()
 
@@ -432,6 +441,137 @@ class TestProductViewset(APITestCase):
         )
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
+    def test_product_search(self):
+        """Tests the search action of the ProductViewset"""
+
+        catalog_index.load()
+
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token ' + str(self._user.auth_token))
+
+        response = self.client.get(reverse('api:product-search'), {'q': 'testprod'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['facets']['categories'], {'food': 1})
+        self.assertEqual(response.data['results'][0]['name'], 'TestProduct')
+
+        response = self.client.get(reverse('api:product-search'), {'q': 'testprod', 'category': 'kitchen'})
+        self.assertEqual(response.data['results'], [])
+
+        response = self.client.get(reverse('api:product-search'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_product_catalog_filters(self):
+        """Tests the query string filters, sorts and facets of the ProductViewset"""
+
+        Product.objects.create(
+            name='Cheap product',
+            description='Description',
+            logo=self.product.logo.name,
+            price='1.50',
+            count=3,
+            category='kitchen',
+            owner=self.associate,
+            holding='LA',
+        )
+
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token ' + str(self._user.auth_token))
+
+        response = self.client.get(reverse('api:product-list'), {'sort': 'price'})
+        self.assertEqual(
+            [product['name'] for product in response.data['results']], ['Cheap product', 'TestProduct'])
+
+        response = self.client.get(reverse('api:product-list'), {'in_stock': 'true', 'category': 'kitchen'})
+        self.assertEqual([product['name'] for product in response.data['results']], ['Cheap product'])
+
+        response = self.client.get(reverse('api:product-list'), {'sort': 'name'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('api:product-facets'), {'category': 'kitchen'})
+
+        self.assertEqual(response.data['total'], 1)
+        self.assertEqual(response.data['categories']['food'], 1)
+
+    def test_product_conditional_get(self):
+        """Tests the ETags of the product list and retrieve actions"""
+
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token ' + str(self._user.auth_token))
+
+        for url in (reverse('api:product-list'), reverse('api:product-detail', args=[self.product.pk])):
+            etag = self.client.get(url)['ETag']
+
+            # The token and the aggregate, without serializing anything
+            with self.assertNumQueries(2):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+            self.product.save()
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+        response = self.client.get(reverse('api:product-detail', args=[0]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_product_sales(self):
+        """Tests that the products show their sales counter shards before they are compacted"""
+
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token ' + str(self._user.auth_token))
+
+        Product.objects.filter(pk=self.product.pk).update(sales=4)
+        counters.add_sales(Product, {self.product.pk: 3})
+        counters.add_sales(Product, {self.product.pk: 3})
+
+        response = self.client.get(reverse('api:product-detail', args=[self.product.pk]))
+        self.assertEqual(response.data['sales'], 10)
+
+        response = self.client.get(reverse('api:product-list'))
+        self.assertEqual(response.data['results'][0]['sales'], 10)
+
+    def test_product_suggest(self):
+        """Tests the typeahead action of the ProductViewset, open to annonymous requests"""
+
+        catalog_suggestions.load()
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('api:product-suggest'), {'q': 'test'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [{'id': self.product.pk, 'name': 'TestProduct'}])
+
+        response = self.client.get(reverse('api:product-suggest'), {'q': 'test', 'limit': 'many'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_product_suggest_ranking(self):
+        """Tests that the typeahead ranks by the sales of the counter shards, reloaded after `SUGGESTION_RELOAD_INTERVAL`"""
+
+        widget = Product.objects.create(
+            name='Test widget',
+            description='Test\nProduct\nDescription',
+            logo=self.test_image,
+            price='9.99',
+            category='food',
+            owner=self.associate,
+            holding='San Francisco',
+        )
+        counters.add_sales(Product, {widget.pk: 2})
+        catalog_suggestions.load()
+
+        response = self.client.get(reverse('api:product-suggest'), {'q': 'test'})
+        self.assertEqual([item['id'] for item in response.data], [widget.pk, self.product.pk])
+
+        counters.add_sales(Product, {self.product.pk: 5})
+
+        response = self.client.get(reverse('api:product-suggest'), {'q': 'test'})
+        self.assertEqual([item['id'] for item in response.data], [widget.pk, self.product.pk])
+
+        with override_settings(SUGGESTION_RELOAD_INTERVAL=0):
+            response = self.client.get(reverse('api:product-suggest'), {'q': 'test'})
+
+        self.assertEqual([item['id'] for item in response.data], [self.product.pk, widget.pk])
+
 
 class TestCartViewSet(APITestCase):
     def setUp(self):
@@ -583,6 +723,114 @@ class TestCartViewSet(APITestCase):
         self.assertEqual(response.status_code,
                          status.HTTP_405_METHOD_NOT_ALLOWED)
 
+    def test_cart_lines(self):
+        """Tests setting many quantities of the active cart in one request"""
+
+        buyer = User.objects.create(email='buyer@test.com', password='T@st123')
+        cart = Cart.objects.get(owner=buyer)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=1)
+        url = reverse('api:cart-lines')
+
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token ' + str(self.user.auth_token))
+        response = self.client.post(url, [{'product': self.product.pk, 'quantity': 2}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(buyer)
+
+        response = self.client.post(url, [{'product': self.product.pk, 'quantity': 20}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 20)
+        self.assertEqual(response.data['lines'], [
+            {'product': self.product.pk, 'name': 'TestProduct', 'price': '99.99', 'quantity': 20}])
+
+        for lines in (
+            [{'product': self.product.pk, 'quantity': -1}],
+            [{'product': self.product.pk, 'quantity': 1}, {'product': self.product.pk, 'quantity': 2}],
+            [{'product': self.product.pk + 100, 'quantity': 1}],
+        ):
+            response = self.client.post(url, lines, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(url, [{'product': self.product.pk, 'quantity': 0}], format='json')
+        self.assertEqual(response.data['count'], 0)
+        self.assertFalse(CartItem.objects.filter(cart=cart).exists())
+
+    def test_current_cart(self):
+        """Tests adding and removing units of the active cart, each returning the cart"""
+
+        buyer = User.objects.create(email='buyer@test.com', password='T@st123')
+        self.client.force_authenticate(buyer)
+
+        response = self.client.get(reverse('api:cart-current'))
+        self.assertEqual(response.data, {'id': Cart.objects.get(owner=buyer).pk, 'count': 0, 'total': '0.00', 'lines': []})
+
+        for _ in range(2):
+            response = self.client.post(reverse('api:cart-add'), {'product': self.product.pk}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['count'], response.data['total']), (2, '199.98'))
+
+        response = self.client.post(reverse('api:cart-remove'), {'product': self.product.pk}, format='json')
+        self.assertEqual(response.data['count'], 1)
+
+        response = self.client.post(reverse('api:cart-add'), {'product': self.product.pk + 100}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse('api:cart-current'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_idempotent_add(self):
+        """Tests that a retried add with the same Idempotency-Key replays instead of adding again"""
+
+        buyer = User.objects.create(email='buyer@test.com', password='T@st123')
+        self.client.force_authenticate(buyer)
+
+        for _ in range(3):
+            response = self.client.post(
+                reverse('api:cart-add'), {'product': self.product.pk}, format='json', HTTP_IDEMPOTENCY_KEY='add-1')
+            self.assertEqual(response.data['count'], 1)
+
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+        self.assertEqual(CartItem.objects.get(cart__owner=buyer).quantity, 1)
+
+        response = self.client.post(
+            reverse('api:cart-remove'), {'product': self.product.pk}, format='json', HTTP_IDEMPOTENCY_KEY='add-1')
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_checkout(self):
+        """Tests the checkout endpoint, its required Idempotency-Key and the replay of retries"""
+
+        buyer = User.objects.create(email='buyer@test.com', password='T@st123')
+        CartItem.objects.create(cart=Cart.objects.get(owner=buyer), product=self.product, quantity=2)
+        self.client.force_authenticate(buyer)
+
+        url = reverse('api:cart-checkout')
+        data = {'address': 'Street 1', 'phone': '123', 'postal_code': '456', 'delivery_method': 'FD'}
+
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Out of stock, nothing is stored so the same key can be retried
+        response = self.client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY='checkout-1')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['products'], [self.product.pk])
+
+        Product.objects.filter(pk=self.product.pk).update(count=5)
+
+        response = self.client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY='checkout-1')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['order']['status'], 'CFD')
+        self.assertEqual(response.data['cart']['count'], 0)
+
+        retry = self.client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY='checkout-1')
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, response.data)
+        self.assertEqual(Order.objects.filter(cart__owner=buyer).count(), 1)
+
+        response = self.client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY='checkout-2')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
 
 class TestCartItemViewSet(APITestCase):
     def setUp(self):
@@ -901,3 +1149,373 @@ class TestOrderViewSet(APITestCase):
         )
         self.assertEqual(response.status_code,
                          status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+class TestCursorPagination(APITestCase):
+    def setUp(self):
+        """Sets up models for testing"""
+
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(b'Test image.')
+            self.test_image = SimpleUploadedFile('test_image.png', f.read())
+
+        self.user = User.objects.create(
+            email='user@test.com', password='T@st123', is_associate=True)
+
+        self.associate = Associate.objects.create(
+            name='Testing co.',
+            description='Testing Co\Testing\nDescription',
+            owner=self.user,
+            logo=self.test_image,
+            website='https://test.co.uk',
+            location='France',
+            slug='test-slug',
+        )
+
+        for i in range(7):
+            Product.objects.create(
+                name=f'TestProduct {i}',
+                description='Test\nProduct\nDescription',
+                logo=self.test_image,
+                price='99.99',
+                category='food',
+                owner=self.associate,
+                holding='San Francisco',
+            )
+
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token ' + str(self.user.auth_token))
+
+    def test_cursor_walk(self):
+        """Tests that following the next links visits every product once"""
+
+        url = reverse('api:product-list') + '?page_size=3'
+        seen = []
+
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 3)
+
+            seen += [product['id'] for product in response.data['results']]
+            url = response.data['next']
+
+            if url:
+                self.assertIn(f'<{url}>; rel="next"', response['Link'])
+
+        expected = list(
+            Product.objects.order_by('-pub_date', '-pk').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_link_header(self):
+        """Tests the Link header of a middle page"""
+
+        response = self.client.get(reverse('api:product-list') + '?page_size=3')
+        response = self.client.get(response.data['next'])
+
+        self.assertIn('rel="next"', response['Link'])
+        self.assertIn('rel="prev"', response['Link'])
+
+    def test_max_page_size(self):
+        """Tests that the requested page size is capped"""
+
+        with mock.patch.object(CursorPagination, 'max_page_size', 2):
+            response = self.client.get(reverse('api:product-list') + '?page_size=100')
+
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+
+class TestIsOrderRelated(APITestCase):
+    def setUp(self):
+        """Sets up models for testing"""
+
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(b'Test image.')
+            self.test_image = SimpleUploadedFile('test_image.png', f.read())
+
+        self.buyer = User.objects.create(email='buyer@test.com', password='T@st123')
+        self.user = User.objects.create(
+            email='user@test.com', password='T@st123', is_associate=True)
+        self._user = User.objects.create(
+            email='2user@test.com', password='T@st123', is_associate=True)
+
+        self.associate = Associate.objects.create(
+            name='Testing co.',
+            description='Testing Co\Testing\nDescription',
+            owner=self.user,
+            logo=self.test_image,
+            website='https://test.co.uk',
+            location='France',
+            slug='test-slug',
+        )
+
+        self.cart = Cart.objects.get(owner=self.buyer)
+        self.permission = IsOrderRelated()
+
+    def add_products(self, count):
+        for i in range(count):
+            product = Product.objects.create(
+                name=f'TestProduct {i}',
+                description='Test\nProduct\nDescription',
+                logo=self.test_image,
+                price='99.99',
+                category='food',
+                owner=self.associate,
+                holding='San Francisco',
+            )
+            CartItem.objects.create(cart=self.cart, product=product)
+
+    def check(self, user, obj):
+        return self.permission.has_object_permission(SimpleNamespace(user=user), None, obj)
+
+    def test_related_users(self):
+        """Tests that the buyer and the selling associate are related and others aren't"""
+
+        self.add_products(2)
+        order = Order.objects.create(cart=self.cart)
+        cartitem = CartItem.objects.filter(cart=self.cart).first()
+
+        for obj in (self.cart, order):
+            self.assertTrue(self.check(self.buyer, obj))
+            self.assertTrue(self.check(self.user, obj))
+            self.assertFalse(self.check(self._user, obj))
+
+        self.assertTrue(self.check(self.user, cartitem))
+        self.assertFalse(self.check(self._user, cartitem))
+
+    def test_constant_queries(self):
+        """Tests that the permission costs one query at most regardless of the cart size"""
+
+        for count in (1, 10):
+            self.add_products(count)
+
+            with self.assertNumQueries(1):
+                self.assertTrue(self.check(self.user, self.cart))
+
+            cart = filter_order_related(Cart.objects.filter(pk=self.cart.pk), self.user).get()
+
+            with self.assertNumQueries(0):
+                self.assertTrue(self.check(self.user, cart))
+
+
+class TestCartSerializerPrefetch(APITestCase):
+    def setUp(self):
+        """Sets up models for testing"""
+
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(b'Test image.')
+            self.test_image = SimpleUploadedFile('test_image.png', f.read())
+
+        self.buyer = User.objects.create(email='buyer@test.com', password='T@st123')
+        self.user = User.objects.create(
+            email='user@test.com', password='T@st123', is_associate=True)
+
+        self.associate = Associate.objects.create(
+            name='Testing co.',
+            description='Testing Co\Testing\nDescription',
+            owner=self.user,
+            logo=self.test_image,
+            website='https://test.co.uk',
+            location='France',
+            slug='test-slug',
+        )
+
+        self.product = Product.objects.create(
+            name='TestProduct',
+            description='Test\nProduct\nDescription',
+            logo=self.test_image,
+            price='99.99',
+            category='food',
+            owner=self.associate,
+            holding='San Francisco',
+        )
+
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token ' + str(self.user.auth_token))
+
+    def place_orders(self, count):
+        for _ in range(count):
+            cart = Cart.objects.get(owner=self.buyer, is_active=True)
+            CartItem.objects.create(cart=cart, product=self.product)
+            Order.objects.create(cart=cart)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, len(queries)
+
+    def test_cartitem_urls(self):
+        """Tests that the carts list the urls of the items sold by the associate"""
+
+        self.place_orders(1)
+        cartitem = CartItem.objects.get()
+
+        response, _ = self.count_queries(reverse('api:order-list'))
+
+        self.assertEqual(
+            response.data['results'][0]['cart']['cartitems'],
+            ['http://testserver' + reverse('api:cartitem-detail', args=[cartitem.pk])]
+        )
+
+    def test_constant_queries(self):
+        """Tests that listing carts and orders costs the same number of queries regardless of their count"""
+
+        self.place_orders(1)
+        _, small_orders = self.count_queries(reverse('api:order-list'))
+        _, small_carts = self.count_queries(reverse('api:cart-list'))
+
+        self.place_orders(10)
+        _, large_orders = self.count_queries(reverse('api:order-list'))
+        _, large_carts = self.count_queries(reverse('api:cart-list'))
+
+        self.assertEqual(small_orders, large_orders)
+        self.assertEqual(small_carts, large_carts)
+
+
+class TestListQueryBudget(APITestCase):
+    """Asserts a fixed query budget for the list endpoints as the tables grow"""
+
+    sizes = (10, 100, 1000)
+
+    def setUp(self):
+        """Sets up models for testing"""
+
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(b'Test image.')
+            self.test_image = SimpleUploadedFile('test_image.png', f.read())
+
+        self.buyer = User.objects.create(email='buyer@test.com', password='T@st123')
+        self.user = User.objects.create(
+            email='user@test.com', password='T@st123', is_associate=True)
+
+        self.associate = Associate.objects.create(
+            name='Testing co.',
+            description='Testing Co\\Testing\\nDescription',
+            owner=self.user,
+            logo=self.test_image,
+            website='https://test.co.uk',
+            location='France',
+            slug='test-slug',
+        )
+
+        self.product = Product.objects.create(
+            name='TestProduct',
+            description='Test\\nProduct\\nDescription',
+            logo=self.test_image,
+            price='99.99',
+            category='food',
+            owner=self.associate,
+            holding='San Francisco',
+        )
+
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token ' + str(self.user.auth_token))
+
+    def grow_products(self, size):
+        Product.objects.bulk_create([
+            Product(
+                name=f'TestProduct {i}',
+                description='Test\\nProduct\\nDescription',
+                logo=self.product.logo.name,
+                price='99.99',
+                category='food',
+                owner=self.associate,
+                holding='San Francisco',
+            ) for i in range(Product.objects.count(), size)
+        ])
+
+    def grow_associates(self, size):
+        start = Associate.objects.count()
+        users = User.objects.bulk_create([
+            User(email=f'{i}@test.com', is_associate=True) for i in range(start, size)
+        ])
+        Associate.objects.bulk_create([
+            Associate(
+                name=f'Testing co. {user.email}',
+                description='Testing Co\\Testing\\nDescription',
+                owner=user,
+                logo=self.associate.logo.name,
+                location='France',
+                slug=f'test-slug-{user.pk}',
+            ) for user in users
+        ])
+
+    def grow_orders(self, size):
+        self.grow_products(size)
+        products = Product.objects.order_by('pk')[Order.objects.count():size]
+        carts = Cart.objects.bulk_create([
+            Cart(owner=self.buyer, is_active=False, count=1)
+            for _ in range(Order.objects.count(), size)
+        ])
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, product=product) for cart, product in zip(carts, products)
+        ])
+        Order.objects.bulk_create([
+            Order(cart=cart, status='CFD') for cart in carts
+        ])
+
+    def assertQueryBudget(self, url, grow, budget):
+        """Grows the table through `sizes` and asserts the list endpoint stays within `budget` queries"""
+
+        for size in self.sizes:
+            grow(size)
+
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, {'page_size': 200})
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertGreaterEqual(len(response.data['results']), min(size, 200))
+            self.assertLessEqual(len(queries), budget, f'{url} with {size} rows')
+
+    # The product and associate budgets include the aggregate behind their ETag
+
+    def test_product_list_budget(self):
+        self.assertQueryBudget(reverse('api:product-list'), self.grow_products, 3)
+
+    def test_associate_list_budget(self):
+        self.assertQueryBudget(reverse('api:associate-list'), self.grow_associates, 4)
+
+    def test_cart_list_budget(self):
+        self.assertQueryBudget(reverse('api:cart-list'), self.grow_orders, 3)
+
+    # The cart item budget includes the prefetch of the products and their sales
+
+    def test_cartitem_list_budget(self):
+        self.assertQueryBudget(reverse('api:cartitem-list'), self.grow_orders, 3)
+
+    def test_order_list_budget(self):
+        self.assertQueryBudget(reverse('api:order-list'), self.grow_orders, 4)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Asserts on the SQLite query plan')
+class TestOrderRelatedQueryPlan(APITestCase):
+    """EXPLAIN based regression tests for the cart, cart item and order scoping"""
+
+    def setUp(self):
+        self.user = User.objects.create(
+            email='user@test.com', password='T@st123', is_associate=True)
+
+    def get_plan(self, model):
+        return filter_order_related(model.objects.order_by('-pk'), self.user).explain()
+
+    def test_no_distinct(self):
+        """Tests that the scoping doesn't de-duplicate a join"""
+
+        for model in (Cart, CartItem, Order):
+            plan = self.get_plan(model)
+
+            self.assertNotIn('DISTINCT', plan)
+            self.assertNotIn('SCAN carts_', plan)
+
+    def test_indexed_lookups(self):
+        """Tests that the scoping is answered from indexes"""
+
+        cart_plan = self.get_plan(Cart)
+        order_plan = self.get_plan(Order)
+
+        self.assertIn('MULTI-INDEX OR', cart_plan)
+        self.assertIn('carts_order_cart_id', order_plan)
+        self.assertIn('COVERING INDEX cartitem_product_cart_idx', cart_plan)
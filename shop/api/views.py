@@ -1,17 +1,36 @@
 from django.contrib.auth import get_user_model
-from django.db.models import Q
-from rest_framework import viewsets, permissions, mixins
-from rest_framework.decorators import permission_classes
+from django.db.models import Count, Max, Prefetch
+from rest_framework import viewsets, permissions, mixins, status
+from rest_framework.decorators import action, permission_classes
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.response import Response
 
 from products.models import Product
+from products.counters import with_sales
+from products.engine import catalog_index, catalog_suggestions
 from associates.models import Associate
+from carts import services as cart_services
+from carts.inventory import OutOfStockError
 from carts.models import Cart, CartItem, Order
 from api import serializers, permissions as cpermissions
+from api.filters import CatalogFilterBackend
+from api.idempotency import idempotent
+from api.mixins import ConditionalGetMixin
 
 
 User = get_user_model()
 
 
+def sold_cartitems(user, lookup):
+    """Prefetches the items sold by `user` into `sold_cartitems` for `CartSerializer`"""
+
+    return Prefetch(
+        lookup,
+        queryset=CartItem.objects.filter(product__owner__owner=user).only('pk', 'cart'),
+        to_attr='sold_cartitems',
+    )
+
+
 # @api_view(['GET'])
 # def api_root(request, format=None):
 #     """
@@ -24,7 +43,8 @@ User = get_user_model()
 
 
 @permission_classes([permissions.IsAuthenticated, cpermissions.IsAssociateOwnerOrReadOnly])
-class AssociateViewset(mixins.RetrieveModelMixin,
+class AssociateViewset(ConditionalGetMixin,
+                       mixins.RetrieveModelMixin,
                        mixins.UpdateModelMixin,
                        mixins.ListModelMixin,
                        viewsets.GenericViewSet):
@@ -33,22 +53,91 @@ class AssociateViewset(mixins.RetrieveModelMixin,
     Basically `ModelViewset` only excluding the create mixin
     """
     serializer_class = serializers.AssociateSerializer
-    queryset = Associate.objects.filter(is_active=True)
     lookup_field = 'slug'
+    ordering = ('-join_date', '-pk')
+
+    def get_queryset(self):
+        return Associate.objects.filter(is_active=True).select_related('owner').prefetch_related(
+            Prefetch('products', queryset=Product.objects.only('pk', 'owner'))
+        )
+
+    def get_conditional_aggregates(self):
+        # Associates list the links of their products
+        return {
+            **super(AssociateViewset, self).get_conditional_aggregates(),
+            'products_updated_at': Max('products__updated_at'),
+            'products_count': Count('products', distinct=True),
+        }
 
 
 @permission_classes([permissions.IsAuthenticated, cpermissions.IsProductOwnerOrReadOnly])
-class ProductViewset(viewsets.ModelViewSet):
+class ProductViewset(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     Viewset for the Product model.
     """
     serializer_class = serializers.ProductSerializer
-    queryset = Product.objects.all()
+    filter_backends = [CatalogFilterBackend]
+    ordering = ('-pub_date', '-pk')
+    suggest_limit = 8
+    max_suggest_limit = 20
+
+    def get_queryset(self):
+        return with_sales(Product.objects.select_related('owner'))
 
     def perform_create(self, serializer):
         associate = Associate.objects.get(owner=self.request.user)
         serializer.save(owner=associate)
 
+    @action(detail=False)
+    def facets(self, request):
+        """Counts the products of every category and holding under the query string filters"""
+
+        return Response(CatalogFilterBackend().get_catalog(request).facets(self.get_queryset()))
+
+    @action(detail=False)
+    def search(self, request):
+        """
+        Searches the products with the in-process `catalog_index`, best matches first.
+        `category` and `holding` narrow the results, the facets count every match.
+        """
+
+        query = request.query_params.get('q')
+
+        if not query:
+            raise ValidationError({'q': 'This query parameter is required.'})
+
+        result = catalog_index.search(
+            query,
+            category=request.query_params.get('category'),
+            holding=request.query_params.get('holding'),
+            limit=self.paginator.get_page_size(request),
+        )
+        products = self.get_queryset().in_bulk(result.ids)
+        serializer = self.get_serializer(
+            [products[pk] for pk in result.ids if pk in products], many=True)
+
+        return Response({
+            'count': result.total,
+            'facets': result.facets,
+            'results': serializer.data,
+        })
+
+    @action(detail=False, permission_classes=[permissions.AllowAny])
+    def suggest(self, request):
+        """
+        Typeahead for the search bar, the best selling products with a word
+        starting with `q`. Served from memory without querying the database.
+        """
+
+        try:
+            limit = min(int(request.query_params.get('limit', self.suggest_limit)), self.max_suggest_limit)
+        except ValueError:
+            raise ValidationError({'limit': 'A valid integer is required.'})
+
+        suggestions = catalog_suggestions.suggest(request.query_params.get('q', ''), max(limit, 0))
+
+        return Response([{'id': pk, 'name': name} for pk, name in suggestions])
+
 
 @permission_classes([permissions.IsAuthenticated, cpermissions.IsOrderRelated])
 class CartViewset(viewsets.ReadOnlyModelViewSet):
@@ -56,12 +145,116 @@ class CartViewset(viewsets.ReadOnlyModelViewSet):
     ReadOnly viewset for the Cart model.
     """
     serializer_class = serializers.CartSerializer
+    ordering = ('-pk',)
 
     def get_queryset(self):
-        return Cart.objects.filter(
-            Q(cartitems__product__owner__owner=self.request.user) |
-            Q(owner=self.request.user)
-        ).distinct()
+        return cpermissions.filter_order_related(
+            Cart.objects.all(), self.request.user
+        ).select_related('owner').prefetch_related(
+            sold_cartitems(self.request.user, 'cartitems')
+        )
+
+    def get_current_cart(self):
+        """Returns the active cart of the user, associates don't shop"""
+
+        if self.request.user.is_associate:
+            raise PermissionDenied('Associates don\'t have carts.')
+
+        return Cart.objects.only('pk', 'owner', 'count').get(owner=self.request.user, is_active=True)
+
+    def current_cart_response(self, cart, status_code=status.HTTP_200_OK):
+        return Response(serializers.CurrentCartSerializer.for_cart(cart).data, status=status_code)
+
+    @action(detail=False, url_path='current', serializer_class=serializers.CurrentCartSerializer)
+    def current(self, request):
+        """The active cart of the user"""
+
+        return self.current_cart_response(self.get_current_cart())
+
+    @action(detail=False, methods=['post'], url_path='current/add', serializer_class=serializers.CartProductSerializer)
+    @idempotent()
+    def add(self, request):
+        """Adds one unit of `product` to the active cart, returns the cart"""
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        cart = self.get_current_cart()
+
+        try:
+            cart_services.add_to_cart(cart, serializer.validated_data['product'])
+
+        except Product.DoesNotExist:
+            raise ValidationError({'product': 'Product not found.'})
+
+        return self.current_cart_response(cart)
+
+    @action(detail=False, methods=['post'], url_path='current/remove', serializer_class=serializers.CartProductSerializer)
+    @idempotent()
+    def remove(self, request):
+        """Removes one unit of `product` from the active cart, returns the cart"""
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        cart = self.get_current_cart()
+
+        if not cart_services.remove_from_cart(cart, serializer.validated_data['product']):
+            raise ValidationError({'product': 'The product isn\'t in the cart.'})
+
+        return self.current_cart_response(cart)
+
+    @action(detail=False, methods=['post'], url_path='current/lines', serializer_class=serializers.CartLinesSerializer)
+    @idempotent()
+    def lines(self, request):
+        """
+        Sets the quantities of many lines of the active cart from a list of
+        `{"product": id, "quantity": n}`, a quantity of 0 removes the line.
+        Returns the cart.
+        """
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        cart = self.get_current_cart()
+
+        try:
+            cart_services.set_cart_lines(
+                cart, {line['product']: line['quantity'] for line in serializer.validated_data})
+
+        except Product.DoesNotExist as error:
+            raise ValidationError({'product': str(error)})
+
+        return self.current_cart_response(cart)
+
+    @action(detail=False, methods=['post'], url_path='current/checkout', serializer_class=serializers.CheckoutSerializer)
+    @idempotent(required=True)
+    def checkout(self, request):
+        """
+        Checks out the active cart with the delivery details, returns the order
+        and the new empty cart. Requires an `Idempotency-Key` header, so a
+        retried checkout replays the first order instead of failing.
+        """
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        if request.user.is_associate:
+            raise PermissionDenied('Associates don\'t have carts.')
+
+        try:
+            order = cart_services.checkout(request.user, **serializer.validated_data)
+
+        except cart_services.CheckoutError as error:
+            return Response({'detail': str(error)}, status=status.HTTP_409_CONFLICT)
+
+        except OutOfStockError as error:
+            return Response(
+                {'detail': 'Some products are out of stock.', 'products': error.product_ids},
+                status=status.HTTP_409_CONFLICT)
+
+        return Response({
+            'order': serializers.CheckoutSerializer(order).data,
+            'cart': serializers.CurrentCartSerializer.for_cart(
+                Cart.objects.get(owner=request.user, is_active=True)).data,
+        }, status=status.HTTP_201_CREATED)
 
 
 @permission_classes([permissions.IsAuthenticated, cpermissions.IsOrderRelated])
@@ -70,11 +263,14 @@ class CartItemViewset(viewsets.ReadOnlyModelViewSet):
     ReadOnly viewset for the CartItem model.
     """
     serializer_class = serializers.CartItemSerializer
+    ordering = ('-pk',)
 
     def get_queryset(self):
-        return CartItem.objects.filter(
-            product__owner__owner=self.request.user
-        )
+        return cpermissions.filter_order_related(
+            CartItem.objects.all(), self.request.user
+        ).prefetch_related(Prefetch(
+            'product', queryset=with_sales(Product.objects.select_related('owner'))
+        ))
 
 
 @permission_classes([permissions.IsAuthenticated, cpermissions.IsOrderRelated])
@@ -83,9 +279,11 @@ class OrderViewset(viewsets.ReadOnlyModelViewSet):
     ReadOnly viewset for the Order model.
     """
     serializer_class = serializers.OrderSerializer
+    ordering = ('-pk',)
 
     def get_queryset(self):
-        return Order.objects.filter(
-            Q(cart__cartitems__product__owner__owner=self.request.user) |
-            Q(cart__owner=self.request.user)
-        ).distinct()
+        return cpermissions.filter_order_related(
+            Order.objects.all(), self.request.user
+        ).select_related('cart__owner').prefetch_related(
+            sold_cartitems(self.request.user, 'cart__cartitems')
+        )
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18 08:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('associates', '0003_associate_is_active_associate_sales'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='associate',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
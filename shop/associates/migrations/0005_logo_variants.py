@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18 08:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('associates', '0004_associate_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='associate',
+            name='logo_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
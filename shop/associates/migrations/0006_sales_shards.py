@@ -0,0 +1,27 @@
+# Generated by Django 5.0 on 2026-10-18 08:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('associates', '0005_logo_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssociateSalesShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('associate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_shards', to='associates.associate')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='associatesalesshard',
+            constraint=models.UniqueConstraint(fields=('associate', 'shard'), name='associate_sales_shard_unique'),
+        ),
+    ]
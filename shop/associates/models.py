@@ -15,7 +15,10 @@ class Associate(models.Model):
     description = models.TextField(max_length=1999)
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
     logo = models.ImageField(blank=False)
+    # Resized copies of the logo, see `products.images`
+    logo_variants = models.JSONField(default=dict, blank=True, editable=False)
     join_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     website = models.URLField(blank=True)
     location = models.CharField(max_length=99, choices=locations, blank=False)
     sales = models.PositiveIntegerField(default=0)
@@ -24,5 +27,29 @@ class Associate(models.Model):
     def get_absolute_url(self):
         return reverse('associates:details', kwargs={'slug': self.slug})
 
+    def get_cache_versions(self):
+        """Names the cached pages showing the associate, see `products.cache`"""
+
+        return [
+            f'associate:{self.slug}',
+            *[f'product:{pk}' for pk in self.products.values_list('pk', flat=True)],
+        ]
+
     def __str__(self):
         return self.name
+
+
+class AssociateSalesShard(models.Model):
+    """One stripe of the sales counter of an associate, see `products.counters`"""
+
+    associate = models.ForeignKey(Associate, on_delete=models.CASCADE, related_name='sales_shards')
+    shard = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['associate', 'shard'], name='associate_sales_shard_unique'),
+        ]
+
+    def __str__(self):
+        return f'{self.associate_id}/{self.shard}: {self.count}'
@@ -3,6 +3,23 @@ from django.dispatch import receiver
 from rest_framework.authtoken.models import Token
 
 from associates.models import Associate
+from products.cache import bump_versions
+from products.tasks import schedule_variants
+
+
+@receiver(post_save, sender=Associate)
+@receiver(post_delete, sender=Associate)
+def invalidate_associate_pages(sender, instance, **kwargs):
+    """Signal which invalidates the cached pages showing the associate"""
+
+    bump_versions(*instance.get_cache_versions())
+
+
+@receiver(post_save, sender=Associate)
+def generate_associate_logo_variants(sender, instance, **kwargs):
+    """Signal which generates the resized copies of a new logo post_save"""
+
+    schedule_variants(instance)
 
 
 @receiver(post_save, sender=Associate)
@@ -1,3 +1,4 @@
+from django.db.models import Count, Max
 from django.views.generic import DetailView, UpdateView
 from django.shortcuts import redirect
 from django.urls import reverse
@@ -5,14 +6,24 @@ from django.urls import reverse
 from associates.models import Associate
 from associates.forms import AssociateUpdateForm
 from products.models import Product
+from products.cache import AnonymousPageCacheMixin, ConditionalPageMixin
 
 
-class AssociateDetailView(DetailView):
+class AssociateDetailView(ConditionalPageMixin, AnonymousPageCacheMixin, DetailView):
     """DetailView for viewing the information about an associate"""
     
     model = Associate
     template_name = 'associates/details.html'
 
+    def get_cache_versions(self):
+        return [f'associate:{self.kwargs["slug"]}']
+
+    def get_conditional_values(self):
+        # The page lists the products of the associate too
+        return Associate.objects.filter(slug=self.kwargs['slug']).annotate(
+            products_updated_at=Max('products__updated_at'), products_count=Count('products'),
+        ).values_list('updated_at', 'products_updated_at', 'products_count').first()
+
     def get_context_data(self, **kwargs):
         data = super().get_context_data(**kwargs)
         associate = self.get_object()
@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from carts import services
 from carts.models import Cart, CartItem, Order
 
 
@@ -41,3 +42,15 @@ class OrderAdmin(admin.ModelAdmin):
 
     list_filter = ('delivery_method', 'status')
     search_fields = ('cart__owner__email',)
+
+    def save_model(self, request, obj, form, change):
+        # Status changes go through the service so canceled orders give their stock back
+        status = obj.status
+
+        if change and 'status' in form.changed_data:
+            obj.status = form.initial['status']
+
+        super(OrderAdmin, self).save_model(request, obj, form, change)
+
+        if obj.status != status:
+            services.set_order_status(obj, status)
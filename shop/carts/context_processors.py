@@ -0,0 +1,13 @@
+from django.utils.functional import SimpleLazyObject
+
+from carts.services import get_cart_count
+
+
+def cart_count(request):
+    """Adds the `cart_count` of the navbar badge, only looked up when a template shows it"""
+
+    def count():
+        user = getattr(request, 'user', None)
+        return get_cart_count(user) if user is not None and user.is_authenticated else 0
+
+    return {'cart_count': SimpleLazyObject(count)}
@@ -4,7 +4,7 @@ delivery_methods = [
     ('SDD', 'Same day delivery'),
 ]
 
-order_statuses = {
+order_statuses = [
     ('CRT', 'Created'),
     ('CFD', 'Confirmed'),
     ('SNT', 'Sent'),
@@ -13,4 +13,7 @@ order_statuses = {
     ('REF', 'Refunded'),
     ('DMG', 'Damaged'),
     ('LST', 'Lost'),
-}
+]
+
+# Maps the short status codes to their labels
+order_status_labels = dict(order_statuses)
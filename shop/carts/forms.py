@@ -1,6 +1,8 @@
 from django import forms
 
 from carts.models import Order
+from carts.services import max_line_quantity
+
 
 class OrderCreateForm(forms.ModelForm):
     """A form that has it's fields are bootstrapified and first and last name and email field are required"""
@@ -26,3 +28,36 @@ class OrderCreateForm(forms.ModelForm):
         self.fields['address'].required = True
         self.fields['phone'].required = True
         self.fields['postal_code'].required = True
+
+
+class CartLineForm(forms.Form):
+    """The quantity of one product of the cart, 0 removes it"""
+
+    product = forms.IntegerField(widget=forms.HiddenInput())
+    quantity = forms.IntegerField(min_value=0, max_value=max_line_quantity)
+
+    def __init__(self, *args, **kwargs):
+        super(CartLineForm, self).__init__(*args, **kwargs)
+
+        self.fields['quantity'].widget.attrs['class'] = 'form-control'
+
+        # The inputs sit in the lines of the cart page, outside of their <form>
+        for field in self.fields.values():
+            field.widget.attrs['form'] = 'cart-lines'
+
+
+class BaseCartLineFormSet(forms.BaseFormSet):
+    def clean(self):
+        """Rejects a product listed twice, like `api.serializers.CartLinesSerializer`"""
+
+        if any(self.errors):
+            return
+
+        products = [form.cleaned_data['product'] for form in self.forms if form.cleaned_data]
+
+        if len(set(products)) != len(products):
+            raise forms.ValidationError('Every product can only be listed once.')
+
+
+CartLineFormSet = forms.formset_factory(
+    CartLineForm, formset=BaseCartLineFormSet, extra=0, max_num=1000, absolute_max=1000)
@@ -0,0 +1,109 @@
+from collections import Counter
+
+from django.db.models import Case, F, Q, When
+from django.utils import timezone
+
+from associates.models import Associate
+from carts.models import CartItem, Order
+from products import counters
+from products.cache import bump_versions
+from products.models import Product
+
+# Statuses giving the reserved stock of an order back
+released_statuses = ('CNC', 'REF', 'LST')
+
+
+class OutOfStockError(Exception):
+    """Raised when products don't have enough stock left, `product_ids` names them"""
+
+    def __init__(self, product_ids):
+        self.product_ids = product_ids
+        super(OutOfStockError, self).__init__(f'Not enough stock of the products {product_ids}.')
+
+
+def cart_lines(cart_pk):
+    """Returns the `(product_id, owner_id, quantity)` lines of a cart"""
+
+    return list(CartItem.objects.filter(cart_id=cart_pk).values_list(
+        'product_id', 'product__owner_id', 'quantity'))
+
+
+def adjust_stock(lines, sign, stamp=None):
+    """
+    Moves the quantities of `lines` out of stock and into sales (`sign=1`) or
+    back (`sign=-1`), with one UPDATE for the products and the sales counters
+    of `products.counters`. Updated rows get `stamp` as `updated_at`.
+    Returns how many products were updated.
+    """
+
+    stamp = stamp or timezone.now()
+
+    quantities = Counter()
+    sales = Counter()
+
+    for product_id, owner_id, quantity in lines:
+        quantities[product_id] += quantity
+        sales[owner_id] += quantity
+
+    if not quantities:
+        return 0
+
+    condition = Q()
+
+    for product_id, quantity in quantities.items():
+        # Reservations only go through while the stock lasts, releases always do
+        condition |= Q(pk=product_id, count__gte=quantity) if sign > 0 else Q(pk=product_id)
+
+    updated = Product.objects.filter(condition).update(
+        count=Case(*[
+            When(pk=product_id, then=F('count') - sign * quantity) for product_id, quantity in quantities.items()
+        ]),
+        updated_at=stamp,
+    )
+
+    if updated == len(quantities):
+        # Sales go to striped counters instead of the product and associate rows
+        counters.add_sales(Product, {product_id: sign * quantity for product_id, quantity in quantities.items()})
+        counters.add_sales(Associate, {owner_id: sign * total for owner_id, total in sales.items()})
+        bump_versions('catalog', *[f'product:{product_id}' for product_id in quantities])
+
+    return updated
+
+
+def reserve(lines):
+    """
+    Takes the quantities of `lines` out of stock and counts them as sales.
+
+    Every product is decremented by a conditional `UPDATE ... WHERE count >= quantity`,
+    so concurrent checkouts can't oversell. Raises `OutOfStockError` when a
+    product is short, the caller's transaction has to roll the others back.
+    """
+
+    quantities = Counter()
+
+    for product_id, _, quantity in lines:
+        quantities[product_id] += quantity
+
+    stamp = timezone.now()
+
+    if adjust_stock(lines, 1, stamp) != len(quantities):
+        # The products the UPDATE skipped kept their previous stamp
+        raise OutOfStockError(sorted(
+            Product.objects.filter(pk__in=quantities).exclude(updated_at=stamp).values_list('pk', flat=True)
+        ))
+
+
+def release(order):
+    """
+    Gives the stock reserved by an order back, once.
+
+    Only orders still marked `reserved` are released, and the mark is cleared
+    by the same conditional update, so repeated calls are no-ops.
+    """
+
+    if Order.objects.filter(pk=order.pk, reserved=True).update(reserved=False):
+        adjust_stock(cart_lines(order.cart_id), -1)
+        order.reserved = False
+        return True
+
+    return False
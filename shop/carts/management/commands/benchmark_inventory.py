@@ -0,0 +1,114 @@
+import random
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction, OperationalError
+
+from associates.models import Associate
+from carts import inventory
+from products.models import Product
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks concurrent stock reservations of one product and checks that none oversell'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--attempts', type=int, default=50, help='Reservations tried by every thread')
+        parser.add_argument('--stock', type=int, default=200)
+        parser.add_argument('--naive', action='store_true', help='Read, check and write the stock in Python instead')
+        parser.add_argument('--max-tries', type=int, default=200, help='Tries of a reservation finding the database locked')
+
+    def handle(self, *args, **options):
+        suffix = uuid.uuid4().hex[:8]
+        user = User.objects.create(email=f'benchmark-{suffix}@example.com', is_associate=True)
+
+        try:
+            associate = Associate.objects.create(
+                name='Benchmark', description='Benchmark', owner=user, website='example.com',
+                location='Nowhere', slug=f'benchmark-{suffix}',
+            )
+            product = Product.objects.create(
+                name='Benchmark', description='Benchmark', price='1.00', category='food',
+                owner=associate, holding='San Francisco', count=options['stock'],
+            )
+            self.run(product, options)
+
+        finally:
+            # Cascades to the associate and the product
+            user.delete()
+
+    def run(self, product, options):
+        reserve = self.reserve_naively if options['naive'] else self.reserve
+        lines = [(product.pk, product.owner_id, 1)]
+        outcomes = []
+        barrier = threading.Barrier(options['threads'])
+
+        def worker():
+            barrier.wait()
+
+            try:
+                for _ in range(options['attempts']):
+                    # A busy database is retried like a client would, up to `--max-tries`
+                    for _ in range(options['max_tries']):
+                        try:
+                            outcomes.append(reserve(lines))
+                            break
+
+                        except OperationalError:
+                            time.sleep(random.uniform(0.001, 0.01))
+
+                    else:
+                        outcomes.append(None)
+
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        start = time.perf_counter()
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        elapsed = time.perf_counter() - start
+        product.refresh_from_db()
+        reserved = outcomes.count(True)
+
+        self.stdout.write(
+            f'{len(outcomes)} reservations in {elapsed:.2f}s ({len(outcomes) / elapsed:.0f}/s): '
+            f'{reserved} reserved, {outcomes.count(False)} out of stock, {outcomes.count(None)} locked, '
+            f'stock left {product.count}, oversold {max(reserved - options["stock"], 0)}'
+        )
+
+        if None in outcomes:
+            raise CommandError(f'{outcomes.count(None)} reservations gave up on a locked database.')
+
+    def reserve(self, lines):
+        try:
+            with transaction.atomic():
+                inventory.reserve(lines)
+
+        except inventory.OutOfStockError:
+            return False
+
+        return True
+
+    def reserve_naively(self, lines):
+        # The read-modify-write the conditional UPDATE replaces
+        product_id, _, quantity = lines[0]
+
+        with transaction.atomic():
+            count = Product.objects.get(pk=product_id).count
+
+            if count < quantity:
+                return False
+
+            Product.objects.filter(pk=product_id).update(count=count - quantity)
+
+        return True
@@ -0,0 +1,49 @@
+# Generated by Django 5.0 on 2026-10-18 07:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def merge_duplicate_lines(apps, schema_editor):
+    """Merges the cart items of a same product in a same cart into the oldest one, summing their quantities"""
+
+    CartItem = apps.get_model('carts', 'CartItem')
+
+    duplicates = (
+        CartItem.objects.values('cart', 'product').order_by()
+        .annotate(lines=Count('pk'), total=Sum('quantity')).filter(lines__gt=1)
+    )
+
+    for duplicate in duplicates:
+        items = CartItem.objects.filter(cart=duplicate['cart'], product=duplicate['product']).order_by('pk')
+        kept = items.first()
+
+        items.exclude(pk=kept.pk).delete()
+        CartItem.objects.filter(pk=kept.pk).update(quantity=duplicate['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carts', '0006_alter_cart_is_active_alter_order_status'),
+        ('products', '0003_product_pub_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cartitem',
+            name='cart',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cartitems', to='carts.cart'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='delivery_method',
+            field=models.CharField(choices=[('ND', 'Normal delivery'), ('FD', 'Fast delivery'), ('SDD', 'Same day delivery')], default='ND', max_length=99),
+        ),
+        migrations.RunPython(merge_duplicate_lines, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('cart', 'product'), name='cartitem_unique_cart_product'),
+        ),
+    ]
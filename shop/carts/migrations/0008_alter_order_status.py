@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18 07:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carts', '0007_cartitem_unique_cart_product'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='status',
+            field=models.CharField(choices=[('CRT', 'Created'), ('CFD', 'Confirmed'), ('SNT', 'Sent'), ('FIN', 'Delivered'), ('CNC', 'Canceled'), ('REF', 'Refunded'), ('DMG', 'Damaged'), ('LST', 'Lost')], default='CRT', max_length=99),
+        ),
+    ]
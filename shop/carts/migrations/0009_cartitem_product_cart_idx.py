@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18 07:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carts', '0008_alter_order_status'),
+        ('products', '0003_product_pub_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cartitem',
+            index=models.Index(fields=['product', 'cart'], name='cartitem_product_cart_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-18 08:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carts', '0009_cartitem_product_cart_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='reserved',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
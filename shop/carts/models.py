@@ -21,6 +21,16 @@ class CartItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.IntegerField(default=1)
 
+    class Meta:
+        constraints = [
+            # One line per product, so quantities can be upserted in place
+            models.UniqueConstraint(fields=['cart', 'product'], name='cartitem_unique_cart_product'),
+        ]
+        indexes = [
+            # Covers the carts sold by an associate, see `api.permissions.carts_sold_by`
+            models.Index(fields=['product', 'cart'], name='cartitem_product_cart_idx'),
+        ]
+
     def __str__(self):
         return ' | '.join(
             (
@@ -40,6 +50,8 @@ class Order(models.Model):
         max_length=99, choices=delivery_methods, default="ND")
     status = models.CharField(
         max_length=99, choices=order_statuses, default='CRT')
+    # Whether the order still holds the stock reserved at checkout, see `carts.inventory`
+    reserved = models.BooleanField(default=False, editable=False)
 
     def __str__(self):
         return ' | '.join(
@@ -0,0 +1,212 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+
+from carts import inventory
+from carts.models import Cart, CartItem, Order
+from products.cache import bump_versions, get_versions
+from products.models import Product
+
+User = get_user_model()
+
+# Upper bound of the quantity of one cart line set in bulk
+max_line_quantity = 999
+
+
+class CheckoutError(Exception):
+    """Raised when a user has no cart to check out, e.g. an empty one or a double submit"""
+
+
+def cart_count_key(user_pk):
+    version, = get_versions(f'cart:{user_pk}')
+
+    return f'cart-count:{user_pk}:{version}'
+
+
+def get_cart_count(user):
+    """
+    Returns the number of units in the active cart of `user` for the navbar badge.
+
+    Summed from the cart lines once per version of the cart, which the cart
+    services bump on every edit, see `invalidate_cart_count`.
+    """
+
+    key = cart_count_key(user.pk)
+    count = cache.get(key)
+
+    if count is None:
+        count = CartItem.objects.filter(cart__owner_id=user.pk, cart__is_active=True).aggregate(
+            total=Sum('quantity'))['total'] or 0
+        # A sum racing an edit is cached under the version the edit bumped, which nobody reads anymore
+        cache.set(key, count, settings.CART_COUNT_TIMEOUT)
+
+    return count
+
+
+def invalidate_cart_count(user_pk):
+    """
+    Bumps the version of the badge count of `user_pk`, now and once the
+    current transaction commits. The next read sums the cart lines again,
+    so callbacks committed out of order can't leave an older count cached.
+    """
+
+    bump_versions(f'cart:{user_pk}')
+
+
+def adjust_cart_count(cart, delta):
+    """
+    Adds `delta` to `Cart.count` with an F() update instead of a read-modify-write
+    save, and invalidates the badge count. The user row isn't touched.
+    """
+
+    Cart.objects.filter(pk=cart.pk).update(count=F('count') + delta)
+    cart.count += delta
+    invalidate_cart_count(cart.owner_id)
+
+
+def add_to_cart(cart, product_id):
+    """
+    Adds one unit of a product to the cart.
+
+    Increments an existing line in place and only falls back to an insert for
+    the first unit, so the common path is two UPDATE statements.
+    Raises `Product.DoesNotExist` for unknown products.
+    """
+
+    with transaction.atomic():
+        updated = CartItem.objects.filter(cart=cart, product_id=product_id).update(
+            quantity=F('quantity') + 1)
+
+        if updated:
+            adjust_cart_count(cart, 1)
+            return
+
+        product = Product.objects.get(pk=product_id)
+
+        try:
+            with transaction.atomic():
+                # `carts.signals.update_user_card_count` adjusts the counters of new lines
+                CartItem.objects.create(cart=cart, product=product, quantity=1)
+
+        except IntegrityError:
+            # A concurrent request created the line first
+            CartItem.objects.filter(cart=cart, product=product).update(quantity=F('quantity') + 1)
+            adjust_cart_count(cart, 1)
+
+
+def remove_from_cart(cart, product_id):
+    """Removes one unit of a product from the cart, returns `False` if the product wasn't in it"""
+
+    with transaction.atomic():
+        updated = CartItem.objects.filter(cart=cart, product_id=product_id, quantity__gt=1).update(
+            quantity=F('quantity') - 1)
+
+        if not updated:
+            updated, _ = CartItem.objects.filter(cart=cart, product_id=product_id).delete()
+
+        if updated:
+            adjust_cart_count(cart, -1)
+
+        return bool(updated)
+
+
+def set_cart_lines(cart, quantities):
+    """
+    Sets the quantities of many cart lines at once from `{product_id: quantity}`,
+    a quantity of 0 removes the line.
+
+    One transaction of a fixed number of statements whatever the number of
+    lines: new lines are upserted with `bulk_create`, existing ones go through
+    `bulk_update` and `Cart.count` is recounted once at the end.
+    Raises `Product.DoesNotExist` for unknown products.
+    """
+
+    with transaction.atomic():
+        existing = {
+            item.product_id: item for item in
+            CartItem.objects.filter(cart=cart, product_id__in=quantities).only('pk', 'product_id', 'quantity')
+        }
+        added = [pk for pk, quantity in quantities.items() if quantity and pk not in existing]
+
+        if added:
+            known = set(Product.objects.filter(pk__in=added).values_list('pk', flat=True))
+            unknown = sorted(set(added) - known)
+
+            if unknown:
+                raise Product.DoesNotExist(f'Unknown products {unknown}.')
+
+            # Upserts, a line a concurrent request created meanwhile is set all the same.
+            # `bulk_create` doesn't send `post_save`, the recount below covers the new lines
+            CartItem.objects.bulk_create(
+                [CartItem(cart=cart, product_id=pk, quantity=quantities[pk]) for pk in added],
+                update_conflicts=True, unique_fields=['cart', 'product'], update_fields=['quantity'],
+            )
+
+        changed = []
+
+        for pk, item in existing.items():
+            if quantities[pk] and item.quantity != quantities[pk]:
+                item.quantity = quantities[pk]
+                changed.append(item)
+
+        if changed:
+            CartItem.objects.bulk_update(changed, ['quantity'])
+
+        removed = [item.pk for pk, item in existing.items() if not quantities[pk]]
+
+        if removed:
+            CartItem.objects.filter(pk__in=removed).delete()
+
+        count = CartItem.objects.filter(cart=cart).aggregate(total=Sum('quantity'))['total'] or 0
+        Cart.objects.filter(pk=cart.pk).update(count=count)
+        invalidate_cart_count(cart.owner_id)
+
+    cart.count = count
+
+
+def checkout(user, **fields):
+    """
+    Turns the active cart of `user` into a confirmed order and opens a new cart.
+
+    The whole transition is one transaction of a fixed number of statements.
+    The cart is claimed with a conditional UPDATE, so of concurrent submits
+    only one can win, the others raise `CheckoutError` like an empty cart does.
+    The stock of the cart is reserved, raising `inventory.OutOfStockError`
+    when a product is short. `fields` are the Order fields, e.g. the address.
+    """
+
+    with transaction.atomic():
+        cart = Cart.objects.filter(owner=user, is_active=True).only('pk', 'count').first()
+
+        if cart is None or not Cart.objects.filter(pk=cart.pk, is_active=True, count__gt=0).update(is_active=False):
+            raise CheckoutError('There is no cart to check out.')
+
+        inventory.reserve(inventory.cart_lines(cart.pk))
+
+        # Confirmed from the start, `carts.signals.update_order_cart` only handles created orders
+        order = Order.objects.create(cart=cart, status='CFD', reserved=True, **fields)
+
+        User.objects.filter(pk=user.pk).update(purchases=F('purchases') + 1)
+        Cart.objects.create(owner_id=user.pk)
+        invalidate_cart_count(user.pk)
+
+    cart.is_active = False
+    user.purchases += 1
+
+    return order
+
+
+def set_order_status(order, status):
+    """
+    Moves an order to `status`, giving its reserved stock back when the status
+    is one of `inventory.released_statuses`.
+    """
+
+    with transaction.atomic():
+        if status in inventory.released_statuses:
+            inventory.release(order)
+
+        Order.objects.filter(pk=order.pk).update(status=status)
+        order.status = status
@@ -1,39 +1,38 @@
+from django.db import transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
 from carts.models import Cart, CartItem, Order
+from carts.services import adjust_cart_count, invalidate_cart_count
+from users.tasks import count_purchase
 
 
 @receiver(post_save, sender=CartItem)
 def update_user_card_count(sender, instance, created, **kwargs):
-    """Signal which updates the `carts.models.Cart.count` and `users.models.User.cart_count` post_save"""
-    
-    if created:
-        cart = instance.cart
-        user = instance.cart.owner
-
-        cart.count += instance.quantity
-        user.cart_count += instance.quantity
+    """Signal which updates the `carts.models.Cart.count` and the cached badge count post_save"""
 
-        cart.save()
-        user.save()
+    if created:
+        adjust_cart_count(instance.cart, instance.quantity)
 
 
 @receiver(post_save, sender=Order)
 def update_order_cart(sender, instance, created, **kwargs):
-    """Signal which updates the cart and the order to prepare it for sending"""
+    """
+    Signal which confirms orders created with the `CRT` status and opens a new
+    cart. `carts.services.checkout` does all of this itself.
+    """
 
-    if created:
+    if created and instance.status == 'CRT':
         cart = instance.cart
-        user = cart.owner
-        
-        cart.is_active = False
-        user.cart_count = 0
-        user.purchases += 1
-        instance.status = 'CFD'
 
-        cart.save()
-        user.save()
-        instance.save()
+        with transaction.atomic():
+            Cart.objects.filter(pk=cart.pk).update(is_active=False)
+            Order.objects.filter(pk=instance.pk).update(status='CFD')
+            Cart.objects.create(owner_id=cart.owner_id)
+            invalidate_cart_count(cart.owner_id)
+
+            # The purchases counter is only statistics, the worker catches up with it
+            count_purchase.delay(cart.owner_id, key=f'count-purchase:{instance.pk}')
 
-        cart = Cart.objects.create(owner=cart.owner)
+        cart.is_active = False
+        instance.status = 'CFD'
@@ -1,11 +1,20 @@
+import random
 import tempfile
-from django.test import TestCase, Client
+import threading
+import time
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection, connections, OperationalError
+from django.test import TestCase, TransactionTestCase, Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 
+from carts import inventory, services
 from carts.models import Cart, CartItem, Order
-from associates.models import Associate
+from associates.models import Associate, AssociateSalesShard
 from users.models import User
+from products import counters
 from products.models import Product
 
 
@@ -253,6 +262,8 @@ class TestOrderModel(TestCase):
     """Test class for testing carts.models.Order"""
 
     def setUp(self):
+        cache.clear()
+
         self.user = User.objects.create(email='user@test.com', password='T@st123')
         self.auser = User.objects.create(email='auser@test.com', password='T@st123', is_associate=True)
         
@@ -310,7 +321,7 @@ class TestOrderModel(TestCase):
 
         self.assertEqual(cart.is_active, False)
         self.assertEqual(cart.count, 2)
-        self.assertEqual(self.user.cart_count, 0)
+        self.assertEqual(services.get_cart_count(self.user), 0)
         self.assertEqual(Cart.objects.filter(owner=self.user, is_active=True).exists(), True)
         self.assertEqual(Cart.objects.filter(owner=self.user, is_active=True).count(), 1)
         self.assertEqual(Cart.objects.get(owner=self.user, is_active=True).count, 0)
@@ -510,3 +521,668 @@ class TestOrderModel(TestCase):
 
         self.assertEqual(response.redirect_chain[0], ('/login/', 302))
         self.assertEqual(response.status_code, 200)
+
+
+class TestCartServices(TestCase):
+    """Test class for testing carts.services"""
+
+    def setUp(self):
+        cache.clear()
+
+        self.user = User.objects.create(email='user@test.com', password='T@st123')
+        self.auser = User.objects.create(email='auser@test.com', password='T@st123', is_associate=True)
+
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(b'Test image.')
+            f.flush()
+            test_image = SimpleUploadedFile('test_image.png', f.read())
+
+        self.associate = Associate.objects.create(
+            name='Testing co.',
+            description='Testing Co\Testing\nDescription',
+            owner = self.auser,
+            logo = test_image,
+            website = 'test.com',
+            location='France',
+            slug='test-slug',
+        )
+
+        self.product = Product.objects.create(
+            name='TestProduct',
+            description='Test\nProduct\nDescription',
+            logo=test_image,
+            price='99.99',
+            category='food',
+            owner=self.associate,
+            holding='San Francisco',
+            count=5,
+        )
+
+        self.cart = Cart.objects.get(owner=self.user)
+
+    def test_add_to_cart_counters(self):
+        """Tests that adding keeps `Cart.count` and the badge count in line with the quantities"""
+
+        self.assertEqual(services.get_cart_count(self.user), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(3):
+                services.add_to_cart(self.cart, self.product.pk)
+
+        self.assertEqual(CartItem.objects.get(cart=self.cart).quantity, 3)
+        self.assertEqual(Cart.objects.get(pk=self.cart.pk).count, 3)
+
+        # The edits invalidated the count, it is summed once and then served from the cache
+        with self.assertNumQueries(1):
+            self.assertEqual(services.get_cart_count(self.user), 3)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(services.get_cart_count(self.user), 3)
+
+    def test_remove_from_cart_counters(self):
+        """Tests that removing keeps the counters in line and deletes the emptied line"""
+
+        services.add_to_cart(self.cart, self.product.pk)
+        services.add_to_cart(self.cart, self.product.pk)
+        self.assertEqual(services.get_cart_count(self.user), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(services.remove_from_cart(self.cart, self.product.pk))
+        self.assertEqual(CartItem.objects.get(cart=self.cart).quantity, 1)
+        self.assertEqual(services.get_cart_count(self.user), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(services.remove_from_cart(self.cart, self.product.pk))
+            self.assertFalse(services.remove_from_cart(self.cart, self.product.pk))
+        self.assertFalse(CartItem.objects.filter(cart=self.cart).exists())
+
+        self.assertEqual(Cart.objects.get(pk=self.cart.pk).count, 0)
+        self.assertEqual(services.get_cart_count(self.user), 0)
+
+    def test_cart_badge(self):
+        """Tests that the navbar badge shows the cached count without touching the user row"""
+
+        client = Client()
+        client.force_login(self.user)
+
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as queries:
+            services.add_to_cart(self.cart, self.product.pk)
+            services.add_to_cart(self.cart, self.product.pk)
+
+        self.assertFalse([query for query in queries if 'users_user' in query['sql']])
+
+        response = client.get(reverse('carts:cart'))
+        self.assertEqual(response.context['cart_count'], 2)
+
+    def test_cart_badge_read_races_edit(self):
+        """Tests that a badge read missing the cache doesn't cache its sum over an edit committed meanwhile"""
+
+        services.add_to_cart(self.cart, self.product.pk)
+        cache.clear()
+        cache_set = cache.set
+
+        def edit_then_set(*args, **kwargs):
+            # The edit commits between the SUM of the read and its `cache.set`
+            with self.captureOnCommitCallbacks(execute=True):
+                services.add_to_cart(self.cart, self.product.pk)
+
+            return cache_set(*args, **kwargs)
+
+        with mock.patch.object(cache, 'set', side_effect=edit_then_set):
+            self.assertEqual(services.get_cart_count(self.user), 1)
+
+        self.assertEqual(services.get_cart_count(self.user), 2)
+
+    def test_add_to_cart_unknown_product(self):
+        """Tests that adding an unknown product raises `Product.DoesNotExist`"""
+
+        with self.assertRaises(Product.DoesNotExist):
+            services.add_to_cart(self.cart, self.product.pk + 100)
+
+    def test_cart_service_query_count(self):
+        """Benchmarks the number of queries of the add and remove operations"""
+
+        services.add_to_cart(self.cart, self.product.pk)
+
+        # UPDATE cart item, UPDATE cart, nothing on the user row (+ the test case savepoint)
+        with self.assertNumQueries(4):
+            services.add_to_cart(self.cart, self.product.pk)
+
+        with self.assertNumQueries(4):
+            services.remove_from_cart(self.cart, self.product.pk)
+
+    def test_set_cart_lines(self):
+        """Tests that many lines are created, updated and removed at once with constant queries"""
+
+        products = [self.product] + [
+            Product.objects.create(
+                name=f'TestProduct{i}', description='Description', logo=self.product.logo,
+                price='1.00', category='food', owner=self.associate, holding='San Francisco',
+            )
+            for i in range(4)
+        ]
+        services.add_to_cart(self.cart, products[0].pk)
+        services.add_to_cart(self.cart, products[1].pk)
+
+        # SELECT the lines and the new products, INSERT, UPDATE, DELETE, SUM and UPDATE the cart (+ savepoint)
+        with self.assertNumQueries(9), self.captureOnCommitCallbacks(execute=True):
+            services.set_cart_lines(self.cart, {
+                products[0].pk: 20, products[1].pk: 0, products[2].pk: 3, products[3].pk: 4,
+            })
+
+        quantities = dict(CartItem.objects.filter(cart=self.cart).values_list('product', 'quantity'))
+        self.assertEqual(quantities, {products[0].pk: 20, products[2].pk: 3, products[3].pk: 4})
+        self.assertEqual(self.cart.count, 27)
+        self.assertEqual(Cart.objects.get(pk=self.cart.pk).count, 27)
+        self.assertEqual(services.get_cart_count(self.user), 27)
+
+        with self.assertRaises(Product.DoesNotExist):
+            services.set_cart_lines(self.cart, {products[4].pk + 100: 1})
+
+    def test_set_cart_lines_view(self):
+        """Tests the bulk quantities form of the cart page"""
+
+        services.add_to_cart(self.cart, self.product.pk)
+
+        client = Client()
+        client.force_login(self.user)
+
+        response = client.get(reverse('carts:cart'))
+        self.assertContains(response, 'name="form-0-quantity"')
+
+        data = {
+            'form-TOTAL_FORMS': '1', 'form-INITIAL_FORMS': '1',
+            'form-0-product': str(self.product.pk), 'form-0-quantity': '20',
+        }
+        response = client.post(reverse('carts:set_cart_lines'), data)
+        self.assertRedirects(response, reverse('carts:cart'))
+        self.assertEqual(CartItem.objects.get(cart=self.cart).quantity, 20)
+
+        data['form-0-quantity'] = '-1'
+        client.post(reverse('carts:set_cart_lines'), data)
+        self.assertEqual(CartItem.objects.get(cart=self.cart).quantity, 20)
+
+        data['form-0-quantity'] = '1000'
+        response = client.post(reverse('carts:set_cart_lines'), data, follow=True)
+        self.assertContains(response, 'Quantity: Ensure this value is less than or equal to 999.')
+        self.assertEqual(CartItem.objects.get(cart=self.cart).quantity, 20)
+
+        duplicates = {
+            **data, 'form-TOTAL_FORMS': '2', 'form-0-quantity': '1',
+            'form-1-product': str(self.product.pk), 'form-1-quantity': '5',
+        }
+        response = client.post(reverse('carts:set_cart_lines'), duplicates, follow=True)
+        self.assertContains(response, 'Every product can only be listed once.')
+        self.assertEqual(CartItem.objects.get(cart=self.cart).quantity, 20)
+
+        data['form-0-quantity'] = '0'
+        client.post(reverse('carts:set_cart_lines'), data)
+        self.assertFalse(CartItem.objects.filter(cart=self.cart).exists())
+
+    def test_checkout(self):
+        """Tests that checking out confirms an order and opens a new cart"""
+
+        services.add_to_cart(self.cart, self.product.pk)
+
+        # SELECT and claim the cart, SELECT the lines, UPDATE the products, INSERT and UPDATE
+        # the product and associate sales shards, INSERT the order, UPDATE the user,
+        # INSERT the new cart (+ savepoint)
+        with self.assertNumQueries(13), self.captureOnCommitCallbacks(execute=True):
+            order = services.checkout(self.user, address='Street 1', phone='123')
+
+        self.assertEqual(order.status, 'CFD')
+        self.assertTrue(order.reserved)
+        self.assertEqual(order.address, 'Street 1')
+        self.assertEqual(order.cart_id, self.cart.pk)
+        self.assertFalse(Cart.objects.get(pk=self.cart.pk).is_active)
+        self.assertEqual(Cart.objects.get(owner=self.user, is_active=True).count, 0)
+
+        self.assertEqual(User.objects.get(pk=self.user.pk).purchases, 1)
+        self.assertEqual(services.get_cart_count(self.user), 0)
+
+    def test_checkout_twice(self):
+        """Tests that a double submit and an empty cart don't create orders"""
+
+        services.add_to_cart(self.cart, self.product.pk)
+        services.checkout(self.user)
+
+        with self.assertRaises(services.CheckoutError):
+            services.checkout(self.user)
+
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(Cart.objects.filter(owner=self.user, is_active=True).count(), 1)
+        self.assertEqual(User.objects.get(pk=self.user.pk).purchases, 1)
+
+    def test_checkout_reserves_stock(self):
+        """Tests that checking out moves the quantities from stock to the sales of the product and associate"""
+
+        for _ in range(3):
+            services.add_to_cart(self.cart, self.product.pk)
+
+        services.checkout(self.user)
+
+        self.assertEqual(Product.objects.get(pk=self.product.pk).count, 2)
+        self.assertEqual(counters.get_sales(Product, [self.product.pk]), {self.product.pk: 3})
+        self.assertEqual(counters.get_sales(Associate, [self.associate.pk]), {self.associate.pk: 3})
+
+    def test_checkout_out_of_stock(self):
+        """Tests that a short product rolls the whole checkout back"""
+
+        for _ in range(6):
+            services.add_to_cart(self.cart, self.product.pk)
+
+        with self.assertRaises(inventory.OutOfStockError) as raised:
+            services.checkout(self.user)
+
+        self.assertEqual(raised.exception.product_ids, [self.product.pk])
+        self.assertTrue(Cart.objects.get(pk=self.cart.pk).is_active)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Product.objects.get(pk=self.product.pk).count, 5)
+        self.assertFalse(AssociateSalesShard.objects.exists())
+
+    def test_cancel_releases_stock(self):
+        """Tests that canceling an order gives its stock back, only once"""
+
+        services.add_to_cart(self.cart, self.product.pk)
+        services.add_to_cart(self.cart, self.product.pk)
+        order = services.checkout(self.user)
+
+        services.set_order_status(order, 'CNC')
+        services.set_order_status(order, 'REF')
+
+        order = Order.objects.get(pk=order.pk)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).count, 5)
+        self.assertEqual(counters.get_sales(Product, [self.product.pk]), {self.product.pk: 0})
+        self.assertEqual(counters.get_sales(Associate, [self.associate.pk]), {self.associate.pk: 0})
+        self.assertEqual((order.status, order.reserved), ('REF', False))
+
+    def test_checkout_view(self):
+        """Tests that the checkout form goes through the checkout service"""
+
+        services.add_to_cart(self.cart, self.product.pk)
+
+        client = Client()
+        client.force_login(self.user)
+        data = {'address': 'Street 1', 'phone': '123', 'postal_code': '456', 'delivery_method': 'FD'}
+
+        response = client.post(reverse('carts:checkout'), data)
+        self.assertRedirects(response, reverse('carts:orders'))
+        self.assertEqual(Order.objects.get().delivery_method, 'FD')
+
+        response = client.post(reverse('carts:checkout'), data)
+        self.assertRedirects(response, reverse('carts:cart'))
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_checkout_view_out_of_stock(self):
+        """Tests that the checkout form tells which products are out of stock"""
+
+        for _ in range(6):
+            services.add_to_cart(self.cart, self.product.pk)
+
+        client = Client()
+        client.force_login(self.user)
+        data = {'address': 'Street 1', 'phone': '123', 'postal_code': '456', 'delivery_method': 'FD'}
+
+        response = client.post(reverse('carts:checkout'), data, follow=True)
+        self.assertRedirects(response, reverse('carts:cart'))
+        self.assertContains(response, 'Not enough stock left of TestProduct.')
+        self.assertFalse(Order.objects.exists())
+
+
+class TestCheckoutLoad(TransactionTestCase):
+    """Hammers the checkout service from many threads at once"""
+
+    users = 10
+    threads_per_user = 4
+    # Retries of a submit finding the database locked before it counts as a failure
+    max_tries = 500
+
+    def setUp(self):
+        cache.clear()
+
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(b'Test image.')
+            f.flush()
+            test_image = SimpleUploadedFile('test_image.png', f.read())
+
+        auser = User.objects.create(email='auser@test.com', password='T@st123', is_associate=True)
+
+        associate = Associate.objects.create(
+            name='Testing co.',
+            description='Testing Co\Testing\nDescription',
+            owner = auser,
+            logo = test_image,
+            website = 'test.com',
+            location='France',
+            slug='test-slug',
+        )
+
+        product = Product.objects.create(
+            name='TestProduct',
+            description='Test\nProduct\nDescription',
+            logo=test_image,
+            price='99.99',
+            category='food',
+            owner=associate,
+            holding='San Francisco',
+            count=self.users,
+        )
+        self.product = product
+
+        self.buyers = [
+            User.objects.create(email=f'{i}@test.com', password='T@st123') for i in range(self.users)
+        ]
+
+        for user in self.buyers:
+            services.add_to_cart(Cart.objects.get(owner=user), product.pk)
+
+    def submit(self, user, barrier, outcomes):
+        barrier.wait()
+
+        try:
+            # A submit that finds the database busy is retried, like a client would
+            for _ in range(self.max_tries):
+                try:
+                    services.checkout(User.objects.get(pk=user.pk))
+                    outcomes.append('ordered')
+                    return
+
+                except OperationalError:
+                    # Jittered, so the waiting threads don't retry in lockstep
+                    time.sleep(random.uniform(0.005, 0.05))
+
+            outcomes.append('locked')
+
+        except services.CheckoutError:
+            outcomes.append('rejected')
+
+        except inventory.OutOfStockError:
+            outcomes.append('out of stock')
+
+        finally:
+            connections.close_all()
+
+    def race(self, threads_per_user):
+        outcomes = []
+        barrier = threading.Barrier(self.users * threads_per_user)
+        threads = [
+            threading.Thread(target=self.submit, args=(user, barrier, outcomes))
+            for user in self.buyers for _ in range(threads_per_user)
+        ]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        return outcomes
+
+    def test_concurrent_double_submits(self):
+        """Tests that every cart becomes exactly one order however many submits race"""
+
+        outcomes = self.race(self.threads_per_user)
+
+        self.assertNotIn('locked', outcomes)
+        self.assertEqual(outcomes.count('ordered'), self.users)
+        self.assertEqual(outcomes.count('rejected'), self.users * (self.threads_per_user - 1))
+
+        for user in self.buyers:
+            self.assertEqual(Order.objects.filter(cart__owner=user).count(), 1)
+            self.assertEqual(Cart.objects.filter(owner=user, is_active=True).count(), 1)
+            self.assertEqual(User.objects.get(pk=user.pk).purchases, 1)
+
+    def test_concurrent_checkouts_dont_oversell(self):
+        """Tests that checkouts racing for the last units never take more than the stock"""
+
+        Product.objects.filter(pk=self.product.pk).update(count=self.users // 2)
+
+        outcomes = self.race(1)
+
+        self.assertNotIn('locked', outcomes)
+        self.assertEqual(outcomes.count('ordered'), self.users // 2)
+        self.assertEqual(outcomes.count('out of stock'), self.users - self.users // 2)
+
+        self.assertEqual(Product.objects.get(pk=self.product.pk).count, 0)
+        self.assertEqual(counters.get_sales(Product, [self.product.pk]), {self.product.pk: self.users // 2})
+        self.assertEqual(Order.objects.count(), self.users // 2)
+
+
+class TestCartView(TestCase):
+    """Test class for testing carts.views.CartProductListView"""
+
+    def setUp(self):
+        self.user = User.objects.create(email='user@test.com', password='T@st123')
+        self.auser = User.objects.create(email='auser@test.com', password='T@st123', is_associate=True)
+
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(b'Test image.')
+            f.flush()
+            self.test_image = SimpleUploadedFile('test_image.png', f.read())
+
+        self.associate = Associate.objects.create(
+            name='Testing co.',
+            description='Testing Co\Testing\nDescription',
+            owner = self.auser,
+            logo = self.test_image,
+            website = 'test.com',
+            location='France',
+            slug='test-slug',
+        )
+
+        self.cart = Cart.objects.get(owner=self.user)
+
+    def add_products(self, count):
+        for i in range(count):
+            product = Product.objects.create(
+                name=f'TestProduct {i}',
+                description='Test\nProduct\nDescription',
+                logo=self.test_image,
+                price='10.5',
+                category='food',
+                owner=self.associate,
+                holding='San Francisco',
+            )
+            CartItem.objects.create(cart=self.cart, product=product, quantity=2)
+
+    def test_cart_totals(self):
+        """Tests the line totals and the cart total computed by the database"""
+
+        self.add_products(3)
+
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(reverse('carts:cart'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item.line_total for item in response.context['cartitem_list']], [21.0] * 3)
+        self.assertEqual(response.context['cart_total'], 63.0)
+
+    def test_cart_constant_queries(self):
+        """Tests that rendering the cart costs the same number of queries regardless of its size"""
+
+        client = Client()
+        client.force_login(self.user)
+
+        # Both with the badge count summed from the lines
+        self.add_products(1)
+        cache.clear()
+        with CaptureQueriesContext(connection) as small:
+            client.get(reverse('carts:cart'))
+
+        self.add_products(5)
+        cache.clear()
+        with CaptureQueriesContext(connection) as large:
+            client.get(reverse('carts:cart'))
+
+        self.assertEqual(len(small), len(large))
+
+
+class TestOrderListView(TestCase):
+    """Test class for testing carts.views.OrderListView"""
+
+    def setUp(self):
+        self.user = User.objects.create(email='user@test.com', password='T@st123')
+        self.auser = User.objects.create(email='auser@test.com', password='T@st123', is_associate=True)
+
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(b'Test image.')
+            f.flush()
+            test_image = SimpleUploadedFile('test_image.png', f.read())
+
+        self.associate = Associate.objects.create(
+            name='Testing co.',
+            description='Testing Co\Testing\nDescription',
+            owner = self.auser,
+            logo = test_image,
+            website = 'test.com',
+            location='France',
+            slug='test-slug',
+        )
+
+        self.product = Product.objects.create(
+            name='TestProduct',
+            description='Test\nProduct\nDescription',
+            logo=test_image,
+            price='99.99',
+            category='food',
+            owner=self.associate,
+            holding='San Francisco',
+        )
+
+    def place_orders(self, count):
+        for _ in range(count):
+            cart = Cart.objects.get(owner=self.user, is_active=True)
+            CartItem.objects.create(cart=cart, product=self.product, quantity=2)
+            Order.objects.create(cart=cart)
+
+    def test_user_order_list(self):
+        """Tests that a user sees their orders, newest first, with status labels"""
+
+        self.place_orders(3)
+
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(reverse('carts:orders'))
+
+        orders = list(response.context['order_list'])
+
+        self.assertEqual([order.pk for order in orders], list(
+            Order.objects.order_by('-pk').values_list('pk', flat=True)))
+        self.assertEqual(orders[0].status_label, 'Confirmed')
+
+    def test_associate_order_list(self):
+        """Tests that an associate sees the orders containing their products once"""
+
+        self.place_orders(2)
+
+        client = Client()
+        client.force_login(self.auser)
+        response = client.get(reverse('carts:orders'))
+
+        self.assertEqual(len(response.context['order_list']), 2)
+
+    def test_order_list_constant_queries(self):
+        """Tests that the order list costs the same number of queries regardless of the order count"""
+
+        client = Client()
+        client.force_login(self.user)
+
+        self.place_orders(1)
+        with CaptureQueriesContext(connection) as small:
+            client.get(reverse('carts:orders'))
+
+        self.place_orders(10)
+        with CaptureQueriesContext(connection) as large:
+            client.get(reverse('carts:orders'))
+
+        self.assertEqual(len(small), len(large))
+
+
+class TestOrderDetailView(TestCase):
+    """Test class for testing carts.views.OrderDetailView"""
+
+    def setUp(self):
+        self.user = User.objects.create(email='user@test.com', password='T@st123')
+        self.auser = User.objects.create(email='auser@test.com', password='T@st123', is_associate=True)
+        self._auser = User.objects.create(email='_auser@test.com', password='T@st123', is_associate=True)
+
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(b'Test image.')
+            f.flush()
+            self.test_image = SimpleUploadedFile('test_image.png', f.read())
+
+        self.associate = Associate.objects.create(
+            name='Testing co.',
+            description='Testing Co\Testing\nDescription',
+            owner = self.auser,
+            logo = self.test_image,
+            website = 'test.com',
+            location='France',
+            slug='test-slug',
+        )
+
+        self._associate = Associate.objects.create(
+            name='Testing co. 2',
+            description='Testing Co\Testing\nDescription',
+            owner = self._auser,
+            logo = self.test_image,
+            website = 'test.com',
+            location='France',
+            slug='test-slug2',
+        )
+
+        self.cart = Cart.objects.get(owner=self.user)
+
+    def add_products(self, associate, count):
+        for i in range(count):
+            product = Product.objects.create(
+                name=f'TestProduct {i}',
+                description='Test\nProduct\nDescription',
+                logo=self.test_image,
+                price='99.99',
+                category='food',
+                owner=associate,
+                holding='San Francisco',
+            )
+            CartItem.objects.create(cart=self.cart, product=product, quantity=1)
+
+    def get_details(self, user, order):
+        client = Client()
+        client.force_login(user)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse('carts:order_details', args=[order.pk]))
+
+        return response, len(queries)
+
+    def test_associate_sees_own_lines(self):
+        """Tests that an associate only sees the lines of their own products"""
+
+        self.add_products(self.associate, 2)
+        self.add_products(self._associate, 3)
+        order = Order.objects.create(cart=self.cart)
+
+        response, _ = self.get_details(self.auser, order)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['cartitem_list']), 2)
+
+        response, _ = self.get_details(self.user, order)
+
+        self.assertEqual(len(response.context['cartitem_list']), 5)
+
+    def test_order_details_constant_queries(self):
+        """Tests that the order details cost the same number of queries regardless of the line count"""
+
+        self.add_products(self.associate, 1)
+        order = Order.objects.create(cart=self.cart)
+        _, small = self.get_details(self.auser, order)
+        _, small_user = self.get_details(self.user, order)
+
+        self.add_products(self.associate, 6)
+        _, large = self.get_details(self.auser, order)
+        _, large_user = self.get_details(self.user, order)
+
+        self.assertEqual(small, large)
+        self.assertEqual(small_user, large_user)
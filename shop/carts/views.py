@@ -1,32 +1,49 @@
 from typing import Any
+from django.db.models import Exists, F, OuterRef, Sum
 from django.db.models.base import Model as Model
 from django.db.models.query import QuerySet
+from django.contrib import messages
+from django.http import Http404
 from django.http.response import HttpResponse as HttpResponse
-from django.views.generic import ListView, UpdateView, CreateView, DetailView
+from django.views.generic import ListView, UpdateView, CreateView, DetailView, FormView
 from django.shortcuts import redirect
 from django.urls import reverse, reverse_lazy
 
 
+from carts import inventory, services
 from carts.models import Cart, CartItem, Order
-from carts.forms import OrderCreateForm
-from carts.datasets import order_statuses
+from carts.forms import CartLineFormSet, OrderCreateForm
+from carts.datasets import order_status_labels
 from products.models import Product
+from products.pagination import KeysetPaginationMixin
 
 
 class CartProductListView(ListView):
-    model = Product
-    ordering = ['-pub_date', '-pk']
+    """ListView for the items of the user's active cart"""
+
+    model = CartItem
+    context_object_name = 'cartitem_list'
     template_name = 'carts/cart.html'
 
+    def get_queryset(self):
+        return CartItem.objects.filter(
+            cart__owner=self.request.user,
+            cart__is_active=True,
+        ).select_related('product').annotate(
+            line_total=F('quantity') * F('product__price')
+        ).order_by('pk')
+
     def get_context_data(self, **kwargs):
         data = super().get_context_data(**kwargs)
 
-        cart = Cart.objects.get(owner=self.request.user, is_active=True)
-
-        cart_item_list = [
-            cartitem for cartitem in CartItem.objects.filter(cart=cart)]
+        data['cart_total'] = self.object_list.aggregate(total=Sum('line_total'))['total'] or 0
 
-        data['cartitem_list'] = cart_item_list
+        # The bulk quantities form of `SetCartLinesView`, one form per line
+        formset = CartLineFormSet(initial=[
+            {'product': item.product_id, 'quantity': item.quantity} for item in data['cartitem_list']
+        ])
+        data['line_formset'] = formset
+        data['cart_lines'] = list(zip(data['cartitem_list'], formset))
 
         return data
 
@@ -46,22 +63,13 @@ class AddToCartView(UpdateView):
     def post(self, request, pk):
         """Adds the product to the user's cart using a post method"""
 
-        product = Product.objects.get(pk=pk)
         cart = Cart.objects.get(owner=request.user, is_active=True)
 
-        if not CartItem.objects.filter(product=product, cart=cart).exists():
-            CartItem.objects.create(cart=cart, product=product, quantity=1)
-
-        else:
-            cart_item = CartItem.objects.get(product=product, cart=cart)
-            cart_item.quantity += 1
-
-            cart.count += 1
-            cart.owner.cart_count += 1
+        try:
+            services.add_to_cart(cart, pk)
 
-            cart.save()
-            cart.owner.save()
-            cart_item.save()
+        except Product.DoesNotExist:
+            raise Http404('Product not found.')
 
         return redirect('carts:cart')
 
@@ -88,30 +96,55 @@ class RemoveFromCartView(UpdateView):
     def post(self, request, pk):
         """Remove the product from the user's cart using a post method"""
 
-        if request.method == 'POST':
-            product = Product.objects.get(pk=pk)
-            cart = Cart.objects.get(owner=request.user, is_active=True)
+        cart = Cart.objects.get(owner=request.user, is_active=True)
+        services.remove_from_cart(cart, pk)
+
+        return redirect('carts:cart')
+
+    def dispatch(self, request, *args, **kwargs):
+        """Redirects user to the index page if the method request isn't POST"""
+
+        if not request.user.is_authenticated:
+            return redirect('users:login')
 
-            if not CartItem.objects.filter(product=product, cart=cart).exists():
-                return redirect('cart')
+        elif request.user.is_associate:
+            return redirect('associates:get_profile')
 
-            else:
-                cart_item = CartItem.objects.get(product=product, cart=cart)
+        elif request.method != 'POST':
+            return redirect(reverse('products:index'))
 
-                if cart_item.quantity == 1:
-                    cart_item.delete()
+        else:
+            return super(RemoveFromCartView, self).dispatch(request, *args, **kwargs)
 
-                else:
-                    cart_item.quantity -= 1
-                    cart_item.save()
 
-                cart.count -= 1
-                cart.owner.cart_count -= 1
+class SetCartLinesView(FormView):
+    """Sets the quantities of many lines of the user's cart in one POST"""
 
-                cart.save()
-                cart.owner.save()
+    form_class = CartLineFormSet
+    http_method_names = ['post']
 
-            return redirect('carts:cart')
+    def form_valid(self, form):
+        quantities = {line['product']: line['quantity'] for line in form.cleaned_data if line}
+        cart = Cart.objects.get(owner=self.request.user, is_active=True)
+
+        try:
+            services.set_cart_lines(cart, quantities)
+
+        except Product.DoesNotExist:
+            raise Http404('Product not found.')
+
+        return redirect('carts:cart')
+
+    def form_invalid(self, form):
+        errors = list(form.non_form_errors())
+
+        for line in form.forms:
+            for name, field_errors in line.errors.items():
+                errors += [f'{line.fields[name].label or name.capitalize()}: {error}' for error in field_errors]
+
+        messages.error(self.request, ' '.join(errors) or 'The cart couldn\'t be updated.')
+
+        return redirect('carts:cart')
 
     def dispatch(self, request, *args, **kwargs):
         """Redirects user to the index page if the method request isn't POST"""
@@ -126,7 +159,7 @@ class RemoveFromCartView(UpdateView):
             return redirect(reverse('products:index'))
 
         else:
-            return super(RemoveFromCartView, self).dispatch(request, *args, **kwargs)
+            return super(SetCartLinesView, self).dispatch(request, *args, **kwargs)
 
 
 class OrderView(CreateView):
@@ -136,11 +169,18 @@ class OrderView(CreateView):
     success_url = reverse_lazy('carts:orders')  # Change to orders
 
     def form_valid(self, form):
-        cart = Cart.objects.get(owner=self.request.user, is_active=True)
+        try:
+            self.object = services.checkout(self.request.user, **form.cleaned_data)
 
-        self.object = form.save(commit=False)
-        self.object.cart = cart
-        self.object.save()
+        except services.CheckoutError:
+            # The cart was emptied or already checked out by another request
+            return redirect('carts:cart')
+
+        except inventory.OutOfStockError as error:
+            names = Product.objects.filter(pk__in=error.product_ids).values_list('name', flat=True)
+            messages.error(self.request, f'Not enough stock left of {", ".join(names)}.')
+
+            return redirect('carts:cart')
 
         return redirect(self.get_success_url())
 
@@ -153,44 +193,40 @@ class OrderView(CreateView):
         elif request.user.is_associate:
             return redirect('associates:get_profile')
 
-        elif not CartItem.objects.filter(cart=Cart.objects.get(owner=self.request.user, is_active=True)).exists():
+        elif not Cart.objects.filter(owner=request.user, is_active=True, count__gt=0).exists():
             return redirect('carts:cart')
 
         else:
             return super(OrderView, self).dispatch(request, *args, **kwargs)
 
 
-class OrderListView(ListView):
+class OrderListView(KeysetPaginationMixin, ListView):
     model = Order
+    ordering = ['-pk']
+    context_object_name = 'order_list'
     template_name = 'carts/order_list.html'
 
-    def get_context_data(self, **kwargs):
-        data = super().get_context_data(**kwargs)
-        
-        if not self.request.user.is_associate:
-            carts = Cart.objects.filter(owner=self.request.user, is_active=False)
+    def get_queryset(self):
+        queryset = Order.objects.select_related('cart__owner')
 
-        else:
-            carts = Cart.objects.filter(
-                cartitems__product__owner__owner=self.request.user
-            ).distinct()
+        if not self.request.user.is_associate:
+            return queryset.filter(cart__owner=self.request.user, cart__is_active=False)
 
-        orders = [Order.objects.get(cart=cart) for cart in carts]
+        return queryset.filter(
+            Exists(CartItem.objects.filter(
+                cart=OuterRef('cart'),
+                product__owner__owner=self.request.user,
+            ))
+        )
 
-        for order in orders:
-            order.status = self.remap_order_status(order.status)
+    def get_context_data(self, **kwargs):
+        data = super().get_context_data(**kwargs)
 
-        data['order_list'] = orders
+        for order in data['order_list']:
+            order.status_label = order_status_labels[order.status]
 
         return data
 
-    def remap_order_status(self, status: str):
-        for short_stats, long_stats in order_statuses:
-            if status == short_stats:
-                return long_stats
-
-        raise ValueError("'status' not in order_statuses!")
-
     def dispatch(self, request, *args, **kwargs):
         """Redirects user to the index page if the user isnt authenticated"""
 
@@ -205,21 +241,33 @@ class OrderDetailView(DetailView):
     model = Order
     template_name = 'carts/order_details.html'
 
-    def get_context_data(self, **kwargs):
-        data = super().get_context_data(**kwargs)
+    def get_queryset(self):
+        return Order.objects.select_related('cart')
+
+    def get_object(self, queryset=None):
+        """Fetches the order once and caches it on the view"""
 
-        cart = self.get_object().cart
+        if getattr(self, 'object', None) is None:
+            self.object = super(OrderDetailView, self).get_object(queryset)
 
-        cart_item_list = [
-            cartitem for cartitem in CartItem.objects.filter(cart=cart)
-        ]
+        return self.object
 
-        if self.request.user.is_associate:
-            cart_item_list = [
-                cartitem for cartitem in cart_item_list if cartitem.product.owner.owner == self.request.user
-            ]
+    def get_cart_items(self):
+        """Returns the lines of the order visible to the user, associates only see their own products"""
 
-        data['cartitem_list'] = cart_item_list
+        if not hasattr(self, 'cart_items'):
+            cart_items = CartItem.objects.filter(cart=self.object.cart_id).select_related('product')
+
+            if self.request.user.is_associate:
+                cart_items = cart_items.filter(product__owner__owner=self.request.user)
+
+            self.cart_items = list(cart_items.order_by('pk'))
+
+        return self.cart_items
+
+    def get_context_data(self, **kwargs):
+        data = super().get_context_data(**kwargs)
+        data['cartitem_list'] = self.get_cart_items()
 
         return data
 
@@ -229,10 +277,12 @@ class OrderDetailView(DetailView):
         if not request.user.is_authenticated:
             return redirect('users:login')
 
-        elif self.get_object().cart.owner != request.user and not request.user.is_associate:
+        order = self.get_object()
+
+        if order.cart.owner_id != request.user.pk and not request.user.is_associate:
             return redirect('carts:orders')
 
-        elif request.user.is_associate and not [item for item in self.get_object().cart.cartitems.all() if item.product.owner.owner == request.user]:
+        elif request.user.is_associate and not self.get_cart_items():
             return redirect('carts:orders')
 
         else:
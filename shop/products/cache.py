@@ -0,0 +1,145 @@
+import datetime
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def version_key(name):
+    return f'version:{name}'
+
+
+def get_versions(*names):
+    """
+    Returns the current version of every name, e.g. `catalog` or `product:1`.
+
+    A missing version starts from the clock rather than from 1, so pages cached
+    before the version got evicted can't be served again.
+    """
+
+    keys = [version_key(name) for name in names]
+    versions = cache.get_many(keys)
+
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns())
+            versions[key] = cache.get(key)
+
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*names):
+    """Invalidates everything cached under the given versions"""
+
+    def bump():
+        for name in names:
+            try:
+                cache.incr(version_key(name))
+
+            except ValueError:
+                # Not cached, the next `get_versions` starts a new one
+                pass
+
+    # Bumps right away for this process and again once committed, so a page
+    # rendered from the old rows in between doesn't outlive the transaction
+    bump()
+    transaction.on_commit(bump)
+
+
+class AnonymousPageCacheMixin:
+    """
+    Caches the rendered page of a view for anonymous visitors.
+
+    Pages are keyed by their full URL and the versions named by
+    `get_cache_versions`, which signals bump when the underlying rows change,
+    so there is no need for short timeouts.
+    """
+
+    def get_cache_versions(self):
+        return ['catalog']
+
+    def get_cache_key(self, request):
+        url = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        versions = '.'.join(str(version) for version in get_versions(*self.get_cache_versions()))
+
+        return f'page:{url}:{versions}'
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+            return super(AnonymousPageCacheMixin, self).dispatch(request, *args, **kwargs)
+
+        key = self.get_cache_key(request)
+        response = cache.get(key)
+
+        if response is not None:
+            return response
+
+        response = super(AnonymousPageCacheMixin, self).dispatch(request, *args, **kwargs)
+
+        if response.status_code == 200 and hasattr(response, 'add_post_render_callback'):
+            response.add_post_render_callback(lambda response: self.cache_response(request, key, response))
+
+        return response
+
+    def cache_response(self, request, key, response):
+        # Pages using a CSRF token get a cookie specific to the visitor
+        if not request.META.get('CSRF_COOKIE_NEEDS_UPDATE'):
+            cache.set(key, response, settings.PAGE_CACHE_TIMEOUT)
+
+
+def get_validators(*values):
+    """
+    Returns an ETag and a Last-Modified timestamp for the values a response is
+    built from, e.g. `updated_at` stamps and row counts.
+    """
+
+    etag = quote_etag(hashlib.md5(repr(values).encode()).hexdigest())
+    stamps = [value for value in values if isinstance(value, datetime.datetime)]
+    last_modified = int(max(stamps).timestamp()) if stamps else None
+
+    return etag, last_modified
+
+
+def not_modified(request, etag, last_modified):
+    """Returns a 304 (or 412) response when the request's validators still match, else `None`"""
+
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def set_validators(response, etag, last_modified):
+    if response.status_code == 200:
+        response.setdefault('ETag', etag)
+
+        if last_modified is not None:
+            response.setdefault('Last-Modified', http_date(last_modified))
+
+    return response
+
+
+class ConditionalPageMixin:
+    """
+    Answers conditional GETs of anonymous visitors with a 304 before the view
+    renders anything. `get_conditional_values` returns what the page is built
+    from with one cheap query, or `None` when the object doesn't exist.
+    """
+
+    def get_conditional_values(self):
+        raise NotImplementedError
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+            return super(ConditionalPageMixin, self).dispatch(request, *args, **kwargs)
+
+        values = self.get_conditional_values()
+
+        if values is None:
+            return super(ConditionalPageMixin, self).dispatch(request, *args, **kwargs)
+
+        etag, last_modified = get_validators(*values)
+
+        return not_modified(request, etag, last_modified) or set_validators(
+            super(ConditionalPageMixin, self).dispatch(request, *args, **kwargs), etag, last_modified)
@@ -0,0 +1,105 @@
+from django.db.models import Count, Q
+
+from products.datasets import categories, holdings
+from products.forms import CatalogFilterForm
+
+# Keyset friendly orderings of the sorts in `products.datasets`, each ending with the pk
+orderings = {
+    'newest': ['-pub_date', '-pk'],
+    'sales': ['-sales', '-pk'],
+    'price': ['price', 'pk'],
+    '-price': ['-price', '-pk'],
+}
+
+
+class Catalog:
+    """
+    Faceted filtering and sorting of products, shared by the catalog pages and
+    `ProductViewset`.
+
+    `data` is a query string, `category` pins the category of the category
+    pages. Invalid filters are left out, `errors` tells which ones they were.
+    """
+
+    def __init__(self, data, category=None):
+        self.form = CatalogFilterForm(data)
+        self.form.is_valid()
+        self.filters = {
+            name: value for name, value in self.form.cleaned_data.items()
+            if value is not None and value != '' and value is not False
+        }
+
+        if category is not None:
+            self.filters['category'] = category
+
+    @property
+    def errors(self):
+        return self.form.errors
+
+    def get_ordering(self):
+        return orderings[self.filters.get('sort', 'newest')]
+
+    def conditions(self):
+        """Returns the filter of every facet as a Q object"""
+
+        conditions = {}
+
+        if 'category' in self.filters:
+            conditions['category'] = Q(category=self.filters['category'])
+
+        if 'holding' in self.filters:
+            conditions['holding'] = Q(holding=self.filters['holding'])
+
+        if 'min_price' in self.filters:
+            conditions['min_price'] = Q(price__gte=self.filters['min_price'])
+
+        if 'max_price' in self.filters:
+            conditions['max_price'] = Q(price__lte=self.filters['max_price'])
+
+        if 'in_stock' in self.filters:
+            conditions['in_stock'] = Q(count__gt=0)
+
+        return conditions
+
+    def combine(self, conditions, exclude=None):
+        combined = Q()
+
+        for name, condition in conditions.items():
+            if name != exclude:
+                combined &= condition
+
+        return combined
+
+    def filter(self, queryset):
+        return queryset.filter(self.combine(self.conditions()))
+
+    def facets(self, queryset):
+        """
+        Counts the products of every category and holding in one aggregate.
+
+        A facet is counted with every filter but its own, so picking a
+        category still shows how many products the other categories have.
+        """
+
+        conditions = self.conditions()
+        aggregates = {'total': Count('pk', filter=self.combine(conditions))}
+
+        for key, _ in categories:
+            aggregates[f'category_{key}'] = Count(
+                'pk', filter=Q(category=key) & self.combine(conditions, exclude='category'))
+
+        for key, _ in holdings:
+            aggregates[f'holding_{key}'] = Count(
+                'pk', filter=Q(holding=key) & self.combine(conditions, exclude='holding'))
+
+        aggregates['in_stock'] = Count(
+            'pk', filter=Q(count__gt=0) & self.combine(conditions, exclude='in_stock'))
+
+        counts = queryset.order_by().aggregate(**aggregates)
+
+        return {
+            'total': counts['total'],
+            'categories': {key: counts[f'category_{key}'] for key, _ in categories},
+            'holdings': {key: counts[f'holding_{key}'] for key, _ in holdings},
+            'in_stock': counts['in_stock'],
+        }
@@ -0,0 +1,129 @@
+import random
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+
+def shards_of(model):
+    """Returns the shard model of a model with `sales_shards` and the name of its foreign key"""
+
+    relation = model.sales_shards.rel
+
+    return relation.related_model, relation.field.attname
+
+
+def sales_key(model, pk):
+    return f'sales:{model._meta.label_lower}:{pk}'
+
+
+def add_sales(model, deltas):
+    """
+    Adds `{pk: delta}` to the sales counters of `model` instances.
+
+    Every counter gets a random one of `SALES_COUNTER_SHARDS` rows, so
+    concurrent checkouts of the same product mostly lock different rows.
+    Two statements whatever the number of counters: one INSERT creating the
+    missing shards and one UPDATE adding to them.
+    """
+
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+
+    if not deltas:
+        return
+
+    shard_model, field = shards_of(model)
+    picks = {pk: random.randrange(settings.SALES_COUNTER_SHARDS) for pk in deltas}
+
+    shard_model.objects.bulk_create([
+        shard_model(**{field: pk}, shard=shard) for pk, shard in picks.items()
+    ], ignore_conflicts=True)
+
+    condition = Q()
+
+    for pk, shard in picks.items():
+        condition |= Q(**{field: pk}, shard=shard)
+
+    shard_model.objects.filter(condition).update(
+        count=Case(*[When(**{field: pk}, then=F('count') + delta) for pk, delta in deltas.items()]))
+
+
+def shard_totals(model):
+    """Returns a subquery summing the shards of the outer `model` row"""
+
+    shard_model, field = shards_of(model)
+
+    return Coalesce(Subquery(
+        shard_model.objects.filter(**{field: OuterRef('pk')}).order_by().values(field)
+        .annotate(total=Sum('count')).values('total')
+    ), Value(0), output_field=IntegerField())
+
+
+def with_sales(queryset):
+    """Annotates the exact `total_sales` of every row, the compacted column plus the shards"""
+
+    return queryset.annotate(total_sales=F('sales') + shard_totals(queryset.model))
+
+
+def get_sales(model, pks):
+    """
+    Returns `{pk: sales}` of `model` instances, the compacted column plus the shards.
+
+    Totals are cached for `SALES_CACHE_TIMEOUT` seconds and writes don't
+    invalidate them, a hot product would otherwise never be cached.
+    """
+
+    keys = {sales_key(model, pk): pk for pk in pks}
+    cached = cache.get_many(keys)
+    sales = {keys[key]: total for key, total in cached.items()}
+    missing = [pk for key, pk in keys.items() if key not in cached]
+
+    if missing:
+        totals = dict(with_sales(model.objects.filter(pk__in=missing)).values_list('pk', 'total_sales'))
+        cache.set_many({sales_key(model, pk): total for pk, total in totals.items()}, settings.SALES_CACHE_TIMEOUT)
+        sales.update(totals)
+
+    return sales
+
+
+def compact(model, batch_size=1000):
+    """
+    Folds the shards of `model` into its `sales` column, returns how many were folded.
+
+    Batches are cut by instance rather than by shard, so every fold nets all
+    the shards of an instance and a release can't be folded apart from the
+    sale it gives back. Shards are decremented by what was folded rather than
+    reset, so sales added while compacting are kept for the next run.
+    """
+
+    shard_model, field = shards_of(model)
+    pending = shard_model.objects.exclude(count=0)
+    folded = 0
+    last = 0
+
+    while True:
+        with transaction.atomic():
+            owners = list(
+                pending.filter(**{f'{field}__gt': last}).order_by(field)
+                .values_list(field, flat=True).distinct()[:batch_size]
+            )
+
+            if not owners:
+                return folded
+
+            shards = list(pending.filter(**{f'{field}__in': owners}).values_list('pk', field, 'count'))
+            totals = defaultdict(int)
+
+            for _, pk, count in shards:
+                totals[pk] += count
+
+            model.objects.filter(pk__in=totals).update(
+                sales=Case(*[When(pk=pk, then=F('sales') + total) for pk, total in totals.items()]))
+            shard_model.objects.filter(pk__in=[pk for pk, _, _ in shards]).update(
+                count=Case(*[When(pk=pk, then=F('count') - count) for pk, _, count in shards]))
+
+        folded += len(shards)
+        last = owners[-1]
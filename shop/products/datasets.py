@@ -16,4 +16,12 @@ holdings = [
     ('BER', 'Berlin'),
     ('PEK', 'Beijing'),
     ('DEL', 'Delhi'),
-]
\ No newline at end of file
+]
+
+# Orderings of the catalog pages
+sorts = [
+    ('newest', 'Newest'),
+    ('sales', 'Best selling'),
+    ('price', 'Price: low to high'),
+    ('-price', 'Price: high to low'),
+]
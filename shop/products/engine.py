@@ -0,0 +1,386 @@
+import heapq
+import math
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter, namedtuple
+
+SearchResult = namedtuple('SearchResult', ['ids', 'total', 'facets'])
+
+
+def tokenize(text):
+    """Splits a text into lowercase word tokens"""
+
+    return re.findall(r'\w+', text.lower())
+
+
+class InvertedIndex:
+    """
+    In-process inverted index over the product catalog.
+
+    Every term maps to two parallel arrays, the sorted document ids and their
+    term frequencies, which keeps postings compact and lets single documents
+    be added or removed with bisect. Queries are ranked with BM25, every query
+    token matches as a prefix, and the matches are counted per category and
+    holding for faceting.
+    """
+
+    k1 = 1.2
+    b = 0.75
+    name_weight = 3
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.postings = {}
+            # Sorted vocabulary for the prefix expansion of query tokens
+            self.terms = []
+            # Document id -> (length, category, holding, terms)
+            self.documents = {}
+            self.total_length = 0
+            # Document id -> BM25 length normalization, reset whenever a document changes
+            self.norms = None
+
+    def __len__(self):
+        return len(self.documents)
+
+    def analyze(self, name, description, category):
+        """Returns the weighted term frequencies of a document"""
+
+        frequencies = Counter()
+
+        for token in tokenize(name):
+            frequencies[token] += self.name_weight
+
+        for token in tokenize(description):
+            frequencies[token] += 1
+
+        frequencies[category] += 1
+
+        return frequencies
+
+    def build(self, documents):
+        """Replaces the index with `(id, name, description, category, holding)` rows"""
+
+        with self.lock:
+            self.clear()
+
+            for doc_id, name, description, category, holding in sorted(documents):
+                frequencies = self.analyze(name, description, category)
+
+                for term, frequency in frequencies.items():
+                    ids, counts = self.postings.setdefault(term, (array('q'), array('I')))
+                    ids.append(doc_id)
+                    counts.append(frequency)
+
+                self.store(doc_id, frequencies, category, holding)
+
+            self.terms = sorted(self.postings)
+
+    def add(self, doc_id, name, description, category, holding):
+        with self.lock:
+            if doc_id in self.documents:
+                self.remove(doc_id)
+
+            frequencies = self.analyze(name, description, category)
+
+            for term, frequency in frequencies.items():
+                if term not in self.postings:
+                    self.postings[term] = (array('q'), array('I'))
+                    self.terms.insert(bisect_left(self.terms, term), term)
+
+                ids, counts = self.postings[term]
+                i = bisect_left(ids, doc_id)
+                ids.insert(i, doc_id)
+                counts.insert(i, frequency)
+
+            self.store(doc_id, frequencies, category, holding)
+
+    def store(self, doc_id, frequencies, category, holding):
+        length = sum(frequencies.values())
+        self.documents[doc_id] = (length, category, holding, tuple(frequencies))
+        self.total_length += length
+        self.norms = None
+
+    def remove(self, doc_id):
+        with self.lock:
+            document = self.documents.pop(doc_id, None)
+
+            if document is None:
+                return
+
+            length, _, _, terms = document
+            self.total_length -= length
+            self.norms = None
+
+            for term in terms:
+                ids, counts = self.postings[term]
+                i = bisect_left(ids, doc_id)
+                del ids[i]
+                del counts[i]
+
+                if not ids:
+                    del self.postings[term]
+                    del self.terms[bisect_left(self.terms, term)]
+
+    def expand(self, token):
+        """Returns the terms of the vocabulary starting with `token`"""
+
+        terms = []
+        i = bisect_left(self.terms, token)
+
+        while i < len(self.terms) and self.terms[i].startswith(token):
+            terms.append(self.terms[i])
+            i += 1
+
+        return terms
+
+    def get_norms(self):
+        if self.norms is None:
+            average_length = self.total_length / len(self.documents)
+            self.norms = {
+                doc_id: self.k1 * (1 - self.b + self.b * document[0] / average_length)
+                for doc_id, document in self.documents.items()
+            }
+
+        return self.norms
+
+    def score_terms(self, terms, candidates=None):
+        """
+        Returns the BM25 scores of the documents containing any of `terms`,
+        only scoring `candidates` when given.
+        """
+
+        scores = {}
+        count = len(self.documents)
+        norms = self.get_norms()
+
+        for term in terms:
+            ids, counts = self.postings[term]
+            idf = math.log(1 + (count - len(ids) + 0.5) / (len(ids) + 0.5)) * (self.k1 + 1)
+
+            for doc_id, frequency in zip(ids, counts):
+                if candidates is None or doc_id in candidates:
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency / (frequency + norms[doc_id])
+
+        return scores
+
+    def search(self, query, category=None, holding=None, limit=None):
+        """
+        Returns the ids of the documents matching every token of `query`, best
+        first, with the facet counts of all the matches.
+        """
+
+        tokens = tokenize(query)
+
+        with self.lock:
+            if not tokens or not self.documents:
+                return SearchResult([], 0, {'categories': {}, 'holdings': {}})
+
+            expansions = [self.expand(token) for token in tokens]
+            # The rarest token goes first so the others only score its matches
+            expansions.sort(key=lambda terms: sum(len(self.postings[term][0]) for term in terms))
+            scores = None
+
+            for terms in expansions:
+                token_scores = self.score_terms(terms, scores)
+
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {
+                        doc_id: score + token_scores[doc_id]
+                        for doc_id, score in scores.items() if doc_id in token_scores
+                    }
+
+                if not scores:
+                    break
+
+            categories = Counter(self.documents[doc_id][1] for doc_id in scores)
+            holdings = Counter(self.documents[doc_id][2] for doc_id in scores)
+
+            if category is not None or holding is not None:
+                scores = {
+                    doc_id: score for doc_id, score in scores.items()
+                    if category in (None, self.documents[doc_id][1])
+                    and holding in (None, self.documents[doc_id][2])
+                }
+
+        # Ties are broken by the newest product first
+        ranked = heapq.nlargest(
+            limit or len(scores), scores.items(), key=lambda item: (item[1], item[0]))
+
+        return SearchResult(
+            [doc_id for doc_id, _ in ranked],
+            len(scores),
+            {'categories': dict(categories), 'holdings': dict(holdings)},
+        )
+
+
+class CatalogIndex(InvertedIndex):
+    """The `InvertedIndex` of the Product table, loaded on first use"""
+
+    def __init__(self):
+        super(CatalogIndex, self).__init__()
+        self.loaded = False
+
+    def load(self):
+        from products.models import Product
+
+        with self.lock:
+            self.build(Product.objects.values_list(
+                'pk', 'name', 'description', 'category', 'holding').iterator())
+            self.loaded = True
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    def index(self, product):
+        # An unloaded index will read the product from the database anyway
+        if self.loaded:
+            self.add(product.pk, product.name, product.description, product.category, product.holding)
+
+    def unindex(self, product_pk):
+        if self.loaded:
+            self.remove(product_pk)
+
+    def search(self, query, category=None, holding=None, limit=None):
+        self.ensure_loaded()
+        return super(CatalogIndex, self).search(query, category, holding, limit)
+
+
+catalog_index = CatalogIndex()
+
+
+class SuggestionIndex:
+    """
+    Sorted array of the lowercase product names for typeahead.
+
+    Every word of a name gets an entry starting at that word, so a prefix is
+    found with a bisect and the matches sit next to each other. Matches are
+    ranked by sales, best selling first.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            # Sorted `(text, id)` entries
+            self.entries = []
+            # Product id -> (name, sales)
+            self.products = {}
+
+    def entries_of(self, doc_id, name):
+        text = ' '.join(tokenize(name))
+        starts = [0] + [i + 1 for i, char in enumerate(text) if char == ' ']
+
+        return [(text[start:], doc_id) for start in starts]
+
+    def build(self, products):
+        """Replaces the index with `(id, name, sales)` rows"""
+
+        with self.lock:
+            self.clear()
+
+            for doc_id, name, sales in products:
+                self.products[doc_id] = (name, sales)
+                self.entries.extend(self.entries_of(doc_id, name))
+
+            self.entries.sort()
+
+    def add(self, doc_id, name, sales):
+        with self.lock:
+            if doc_id in self.products:
+                self.remove(doc_id)
+
+            self.products[doc_id] = (name, sales)
+
+            for entry in self.entries_of(doc_id, name):
+                self.entries.insert(bisect_left(self.entries, entry), entry)
+
+    def remove(self, doc_id):
+        with self.lock:
+            product = self.products.pop(doc_id, None)
+
+            if product is None:
+                return
+
+            for entry in self.entries_of(doc_id, product[0]):
+                del self.entries[bisect_left(self.entries, entry)]
+
+    def suggest(self, prefix, limit=10):
+        """Returns up to `limit` `(id, name)` pairs of the products with a word starting with `prefix`"""
+
+        prefix = ' '.join(tokenize(prefix))
+
+        if not prefix:
+            return []
+
+        with self.lock:
+            matches = set()
+            i = bisect_left(self.entries, (prefix,))
+
+            while i < len(self.entries) and self.entries[i][0].startswith(prefix):
+                matches.add(self.entries[i][1])
+                i += 1
+
+            best = heapq.nlargest(
+                limit, matches, key=lambda doc_id: (self.products[doc_id][1], doc_id))
+
+            return [(doc_id, self.products[doc_id][0]) for doc_id in best]
+
+
+class CatalogSuggestions(SuggestionIndex):
+    """
+    The `SuggestionIndex` of the Product table, loaded on first use.
+
+    Sales move through counter shards without any signal, so the index ranks
+    by the sales totals of its last load and reloads once they are older than
+    `SUGGESTION_RELOAD_INTERVAL` seconds.
+    """
+
+    def __init__(self):
+        super(CatalogSuggestions, self).__init__()
+        self.loaded_at = None
+
+    @property
+    def loaded(self):
+        return self.loaded_at is not None
+
+    def load(self):
+        from products.counters import with_sales
+        from products.models import Product
+
+        with self.lock:
+            self.build(with_sales(Product.objects.all()).values_list('pk', 'name', 'total_sales').iterator())
+            self.loaded_at = time.monotonic()
+
+    def index(self, product):
+        if self.loaded:
+            with self.lock:
+                # A saved product only knows its compacted sales, keep the total of the last load
+                sales = self.products.get(product.pk, (None, product.sales))[1]
+                self.add(product.pk, product.name, sales)
+
+    def unindex(self, product_pk):
+        if self.loaded:
+            self.remove(product_pk)
+
+    def suggest(self, prefix, limit=10):
+        from django.conf import settings
+
+        if not self.loaded or time.monotonic() - self.loaded_at >= settings.SUGGESTION_RELOAD_INTERVAL:
+            self.load()
+
+        return super(CatalogSuggestions, self).suggest(prefix, limit)
+
+
+catalog_suggestions = CatalogSuggestions()
@@ -1,6 +1,7 @@
 from django import forms
 
 from products.models import Product
+from products.datasets import categories, holdings, sorts
 
 class ProductCreateForm(forms.ModelForm):
     """A form for updating an associate with the correct fields"""
@@ -34,3 +35,26 @@ class ProductCreateForm(forms.ModelForm):
         self.fields['count'].required = True
         self.fields['category'].required = True
         self.fields['holding'].required = True
+
+
+class CatalogFilterForm(forms.Form):
+    """Query string filters and ordering of the catalog, see `products.catalog`"""
+
+    category = forms.ChoiceField(choices=[('', 'Any category')] + categories, required=False)
+    holding = forms.ChoiceField(choices=[('', 'Anywhere')] + holdings, required=False)
+    min_price = forms.FloatField(min_value=0, required=False)
+    max_price = forms.FloatField(min_value=0, required=False)
+    in_stock = forms.BooleanField(required=False)
+    sort = forms.ChoiceField(choices=sorts, required=False)
+
+    def __init__(self, *args, **kwargs):
+        super(CatalogFilterForm, self).__init__(*args, **kwargs)
+
+        self.fields['category'].widget.attrs['class'] = 'form-select form-select-sm'
+        self.fields['holding'].widget.attrs['class'] = 'form-select form-select-sm'
+        self.fields['min_price'].widget.attrs['class'] = 'form-control form-control-sm'
+        self.fields['min_price'].widget.attrs['placeholder'] = 'Min $'
+        self.fields['max_price'].widget.attrs['class'] = 'form-control form-control-sm'
+        self.fields['max_price'].widget.attrs['placeholder'] = 'Max $'
+        self.fields['sort'].widget.attrs['class'] = 'form-select form-select-sm'
+        self.fields['in_stock'].widget.attrs['class'] = 'form-check-input'
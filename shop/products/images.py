@@ -0,0 +1,84 @@
+import hashlib
+import io
+import posixpath
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from products.cache import bump_versions
+
+# Pillow format and extension of every variant, the first one is the fallback of the <picture> tag
+formats = {
+    'jpeg': ('JPEG', 'jpg'),
+    'webp': ('WEBP', 'webp'),
+}
+
+
+def generate_variants(field_file):
+    """
+    Encodes the resized variants of an image next to it and returns their names as
+    `{'source': name, 'jpeg': {'300': name, ...}, 'webp': {...}}`.
+
+    Names end with a hash of their content, so they can be cached forever.
+    Images Pillow can't read only get a `source`, templates then fall back to
+    the original.
+    """
+
+    variants = {'source': field_file.name}
+
+    try:
+        with field_file.open('rb') as f:
+            image = ImageOps.exif_transpose(Image.open(f))
+            image.load()
+
+    except (UnidentifiedImageError, OSError, ValueError):
+        return variants
+
+    image = image.convert('RGB')
+    stem = posixpath.splitext(field_file.name)[0]
+
+    for name, (pillow_format, extension) in formats.items():
+        variants[name] = {}
+
+        for width in settings.IMAGE_VARIANT_WIDTHS:
+            resized = image.copy()
+            # Only ever shrinks, narrower originals are encoded as they are
+            resized.thumbnail((width, image.height))
+
+            buffer = io.BytesIO()
+            resized.save(buffer, pillow_format, quality=settings.IMAGE_VARIANT_QUALITY)
+            content = buffer.getvalue()
+
+            digest = hashlib.sha256(content).hexdigest()[:12]
+            path = f'{stem}.{width}.{digest}.{extension}'
+
+            if not field_file.storage.exists(path):
+                path = field_file.storage.save(path, ContentFile(content))
+
+            variants[name][str(width)] = path
+
+    return variants
+
+
+def store_variants(model_label, pk):
+    """Generates the variants of an instance's logo and saves them without a full `save()`"""
+
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).first()
+
+    if instance is None or not instance.logo:
+        return
+
+    variants = generate_variants(instance.logo)
+    changes = {'logo_variants': variants, 'updated_at': timezone.now()}
+
+    if hasattr(instance, 'version'):
+        changes['version'] = F('version') + 1
+
+    # A newer upload has its own job, its variants must not be overwritten
+    if model.objects.filter(pk=pk, logo=instance.logo.name).update(**changes):
+        bump_versions(*instance.get_cache_versions())
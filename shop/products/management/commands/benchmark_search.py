@@ -0,0 +1,62 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.datasets import categories, holdings
+from products.engine import InvertedIndex
+
+syllables = ['ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'te', 'vo', 'zi', 'bra', 'ch', 'dor', 'fen', 'gul']
+
+# Synthetic vocabulary where a few words are common and most are rare, like product texts
+words = [a + b + c for a in syllables for b in syllables for c in syllables]
+weights = [1 / rank for rank in range(1, len(words) + 1)]
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the in-process inverted index against an icontains style scan on synthetic products'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10_000, 100_000, 1_000_000])
+        parser.add_argument('--queries', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rand = random.Random(options['seed'])
+        queries = [
+            ' '.join(rand.choices(words, weights, k=rand.randint(1, 2))) for _ in range(options['queries'])
+        ]
+
+        for size in options['sizes']:
+            documents = [
+                (
+                    pk,
+                    ' '.join(rand.choices(words, weights, k=3)),
+                    ' '.join(rand.choices(words, weights, k=12)),
+                    rand.choice(categories)[0],
+                    rand.choice(holdings)[0],
+                )
+                for pk in range(1, size + 1)
+            ]
+
+            index = InvertedIndex()
+            start = time.perf_counter()
+            index.build(documents)
+            build = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for query in queries:
+                index.search(query, limit=20)
+            indexed = (time.perf_counter() - start) / len(queries)
+
+            # What `name__icontains` does without an index: a full scan of every row
+            start = time.perf_counter()
+            for query in queries:
+                needle = query.lower()
+                [pk for pk, name, *_ in documents if needle in name.lower()]
+            scanned = (time.perf_counter() - start) / len(queries)
+
+            self.stdout.write(
+                f'{size:>9} products: build {build:.2f}s, '
+                f'index {indexed * 1000:.2f}ms/query, icontains scan {scanned * 1000:.2f}ms/query'
+            )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from associates.models import Associate
+from products import counters
+from products.cache import bump_versions
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Folds the sales counter shards into the sales columns, run it periodically e.g. from cron'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        products = counters.compact(Product, options['batch_size'])
+        associates = counters.compact(Associate, options['batch_size'])
+
+        if products:
+            # The catalog sorts by the compacted column
+            bump_versions('catalog')
+
+        self.stdout.write(self.style.SUCCESS(f'Compacted {products} product and {associates} associate sales shards.'))
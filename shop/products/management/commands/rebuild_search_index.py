@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from products.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the product search index from the products table'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        backend.rebuild()
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the {type(backend).__name__} index.'))
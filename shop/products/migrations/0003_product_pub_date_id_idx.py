@@ -0,0 +1,24 @@
+# Generated by Django 5.0 on 2026-10-18 07:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('associates', '0003_associate_is_active_associate_sales'),
+        ('products', '0002_product_count'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='owner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='products', to='associates.associate'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-pub_date', '-id'], name='product_pub_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """Creates the full-text index table of the search backend matching the database"""
+
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE products_product_fts USING fts5("
+            "name, description, category, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+        schema_editor.execute(
+            "INSERT INTO products_product_fts (rowid, name, description, category) "
+            "SELECT id, name, description, category FROM products_product"
+        )
+
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE products_product_search ("
+            "product_id bigint PRIMARY KEY REFERENCES products_product (id) ON DELETE CASCADE "
+            "DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX products_product_search_document_idx "
+            "ON products_product_search USING GIN (document)"
+        )
+        schema_editor.execute(
+            "INSERT INTO products_product_search (product_id, document) "
+            "SELECT id, "
+            "setweight(to_tsvector('english', name), 'A') || "
+            "setweight(to_tsvector('english', description), 'C') || "
+            "setweight(to_tsvector('english', category), 'B') "
+            "FROM products_product"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE products_product_fts")
+
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP TABLE products_product_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_product_pub_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0 on 2026-10-18 08:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_logo_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSalesShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_shards', to='products.product')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='productsalesshard',
+            constraint=models.UniqueConstraint(fields=('product', 'shard'), name='product_sales_shard_unique'),
+        ),
+    ]
@@ -13,13 +13,70 @@ class Product(models.Model):
     sales = models.PositiveIntegerField(default=0)
     count = models.PositiveIntegerField(default=0)
     pub_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     category = models.CharField(max_length=99, choices=categories)
     owner = models.ForeignKey(
         Associate, on_delete=models.CASCADE, related_name='products')
     holding = models.CharField(max_length=99, choices=holdings)
+    # Resized copies of the logo, see `products.images`
+    logo_variants = models.JSONField(default=dict, blank=True, editable=False)
+    # Stamps the cached fragments of the product, bumped on every save
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    class Meta:
+        indexes = [
+            # Backs the keyset pagination of the catalog pages
+            models.Index(fields=['-pub_date', '-id'], name='product_pub_date_id_idx'),
+            # Back the filters and sorts of `products.catalog`
+            models.Index(fields=['category', '-pub_date', '-id'], name='product_category_pub_date_idx'),
+            models.Index(fields=['holding'], name='product_holding_idx'),
+            models.Index(fields=['price', 'id'], name='product_price_id_idx'),
+            models.Index(fields=['-sales', '-id'], name='product_sales_id_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        bump = not self._state.adding
+
+        if bump:
+            # Incremented by the UPDATE itself, a stale instance can't reuse or lower the version
+            self.version = models.F('version') + 1
+
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'version', 'updated_at'}
+
+        super(Product, self).save(*args, **kwargs)
+
+        if bump:
+            self.refresh_from_db(fields=['version'])
 
     def get_absolute_url(self):
         return reverse("products:details", kwargs={"pk": self.pk})
 
+    def get_cache_versions(self):
+        """Names the cached pages showing the product, see `products.cache`"""
+
+        return ['catalog', f'product:{self.pk}', f'associate:{self.owner.slug}']
+
     def __str__(self):
         return ' | '.join((str(self.owner), self.name, '$' + str(self.price)))
+
+
+class ProductSalesShard(models.Model):
+    """
+    One stripe of the sales counter of a product, see `products.counters`.
+
+    Checkouts add to a random shard instead of the product row, so a hot
+    product doesn't serialize them. `compact_sales` folds them into `sales`.
+    """
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='sales_shards')
+    shard = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'shard'], name='product_sales_shard_unique'),
+        ]
+
+    def __str__(self):
+        return f'{self.product_id}/{self.shard}: {self.count}'
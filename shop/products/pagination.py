@@ -0,0 +1,174 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+
+class KeysetPage:
+    """A single page returned by `KeysetPaginationMixin`"""
+
+    def __init__(self, object_list, next_url=None, previous_url=None):
+        self.object_list = object_list
+        self.next_url = next_url
+        self.previous_url = previous_url
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_url is not None
+
+    def has_previous(self):
+        return self.previous_url is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginationMixin:
+    """
+    Cursor (keyset) pagination for ListViews.
+
+    Instead of an OFFSET, a page is located by the ordering values of the
+    last (or first) row of the neighbouring page, so deep pages cost the same
+    indexed range scan as the first one. The ordering always ends with the
+    primary key so that cursors are unique.
+    """
+
+    paginate_by = 20
+    after_kwarg = 'after'
+    before_kwarg = 'before'
+
+    def get_keyset_fields(self):
+        """Returns the ordering as a list of `(field_name, descending)` pairs"""
+
+        ordering = self.get_ordering() or ['-pk']
+
+        if isinstance(ordering, str):
+            ordering = [ordering]
+
+        fields = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+
+        if fields[-1][0] not in ('pk', 'id'):
+            fields.append(('pk', fields[-1][1]))
+
+        return fields
+
+    def paginate_queryset(self, queryset, page_size):
+        fields = self.get_keyset_fields()
+        after = self.request.GET.get(self.after_kwarg)
+        before = self.request.GET.get(self.before_kwarg)
+
+        if before:
+            values = self.decode_cursor(before, queryset.model, fields)
+            rows = list(
+                queryset.filter(self.keyset_filter(fields, values, reverse=True))
+                .order_by(*self.keyset_ordering(fields, reverse=True))[:page_size + 1]
+            )
+            has_previous = len(rows) > page_size
+            rows = rows[:page_size][::-1]
+            has_next = True
+
+        else:
+            values = self.decode_cursor(after, queryset.model, fields) if after else None
+            queryset = queryset.order_by(*self.keyset_ordering(fields))
+
+            if values is not None:
+                queryset = queryset.filter(self.keyset_filter(fields, values))
+
+            rows = list(queryset[:page_size + 1])
+            has_next = len(rows) > page_size
+            rows = rows[:page_size]
+            has_previous = values is not None
+
+        next_url = previous_url = None
+
+        if rows and has_next:
+            next_url = self.get_page_url(self.after_kwarg, self.encode_cursor(rows[-1], fields))
+
+        if rows and has_previous:
+            previous_url = self.get_page_url(self.before_kwarg, self.encode_cursor(rows[0], fields))
+
+        page = KeysetPage(rows, next_url, previous_url)
+
+        return (None, page, rows, page.has_other_pages())
+
+    def keyset_ordering(self, fields, reverse=False):
+        return [('-' if descending != reverse else '') + name for name, descending in fields]
+
+    def keyset_filter(self, fields, values, reverse=False):
+        """Builds `(a, b, c) < (x, y, z)` as a chain of ORs, in the direction of the ordering"""
+
+        condition = Q()
+
+        for i, (name, descending) in enumerate(fields):
+            lookup = 'lt' if descending != reverse else 'gt'
+            term = Q(**{f'{name}__{lookup}': values[i]})
+
+            for j, (prev_name, _) in enumerate(fields[:i]):
+                term &= Q(**{prev_name: values[j]})
+
+            condition |= term
+
+        return condition
+
+    def encode_cursor(self, obj, fields):
+        values = []
+
+        for name, _ in fields:
+            value = getattr(obj, name)
+
+            if isinstance(value, (datetime.date, datetime.datetime)):
+                value = value.isoformat()
+
+            values.append(value)
+
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, cursor, model, fields):
+        """Decodes a cursor into field values, raising Http404 for tampered cursors"""
+
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+
+            if not isinstance(values, list) or len(values) != len(fields):
+                raise ValueError
+
+            return [
+                self.decode_value(model, name, value)
+                for (name, _), value in zip(fields, values)
+            ]
+
+        except (ValueError, TypeError, binascii.Error, ValidationError):
+            raise Http404('Invalid page cursor.')
+
+    def decode_value(self, model, name, value):
+        """Converts a cursor value back with its model field, annotations are kept as decoded"""
+
+        if name == 'pk':
+            name = model._meta.pk.name
+
+        try:
+            field = model._meta.get_field(name)
+
+        except FieldDoesNotExist:
+            if not isinstance(value, (int, float, str)):
+                raise ValueError
+            return value
+
+        return field.to_python(value)
+
+    def get_page_url(self, kwarg, cursor):
+        query = self.request.GET.copy()
+        query.pop(self.after_kwarg, None)
+        query.pop(self.before_kwarg, None)
+        query[kwarg] = cursor
+
+        return '?' + query.urlencode()
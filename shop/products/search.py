@@ -0,0 +1,216 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, Count, FloatField, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from products.engine import catalog_index, tokenize
+
+
+class SearchBackend:
+    """
+    Base class of the product search backends.
+
+    `search` filters a Product queryset by a query and annotates a `rank`
+    where lower is better, so views can order by `('rank', '-pk')`.
+    """
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+    def no_results(self, queryset):
+        """An empty result still carrying the `rank` the views order by"""
+
+        return queryset.none().annotate(rank=Value(0.0, output_field=FloatField()))
+
+    def index(self, product):
+        pass
+
+    def remove(self, product_pk):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def facets(self, queryset, query):
+        """Returns the number of matches per category and holding"""
+
+        matches = self.search(queryset, query).order_by()
+
+        return {
+            field: dict(matches.values_list(field).annotate(Count('pk')))
+            for field in ('category', 'holding')
+        }
+
+    def document(self, product):
+        """Returns the indexed columns of a product"""
+
+        return (product.name, product.description, product.category)
+
+
+class IcontainsSearchBackend(SearchBackend):
+    """Fallback backend matching product names with `icontains`, without ranking"""
+
+    def search(self, queryset, query):
+        return queryset.filter(name__icontains=query).annotate(
+            rank=Value(0.0, output_field=FloatField()))
+
+
+class InMemorySearchBackend(SearchBackend):
+    """
+    Backend querying the in-process `products.engine.catalog_index`, needs no
+    database specific features. Only the best `max_results` matches are returned.
+    The index itself is kept up to date by `products.signals`.
+    """
+
+    max_results = 1000
+
+    def search(self, queryset, query):
+        ids = catalog_index.search(query, limit=self.max_results).ids
+
+        if not ids:
+            return self.no_results(queryset)
+
+        return queryset.filter(pk__in=ids).annotate(rank=Case(
+            *[When(pk=pk, then=Value(float(position))) for position, pk in enumerate(ids)],
+            output_field=FloatField(),
+        ))
+
+    def facets(self, queryset, query):
+        facets = catalog_index.search(query).facets
+
+        return {'category': facets['categories'], 'holding': facets['holdings']}
+
+    def rebuild(self):
+        catalog_index.load()
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """
+    Backend using the `products_product_fts` FTS5 table created by the migrations.
+    Results are ranked with bm25, weighting names over categories over descriptions.
+    """
+
+    table = 'products_product_fts'
+    weights = (10.0, 1.0, 2.0)
+
+    def match(self, query):
+        """Builds an FTS5 query where every token is a prefix that has to match"""
+
+        return ' '.join(f'"{token}"*' for token in tokenize(query))
+
+    def search(self, queryset, query):
+        match = self.match(query)
+
+        if not match:
+            return self.no_results(queryset)
+
+        weights = ', '.join(str(weight) for weight in self.weights)
+
+        return queryset.filter(
+            pk__in=RawSQL(f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s', [match])
+        ).annotate(rank=RawSQL(
+            f'SELECT bm25({self.table}, {weights}) FROM {self.table} '
+            f'WHERE {self.table} MATCH %s AND rowid = products_product.id',
+            [match],
+            output_field=FloatField(),
+        ))
+
+    def index(self, product):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [product.pk])
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, name, description, category) VALUES (%s, %s, %s, %s)',
+                [product.pk, *self.document(product)]
+            )
+
+    def remove(self, product_pk):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [product_pk])
+
+    def rebuild(self):
+        from products.models import Product
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, name, description, category) VALUES (%s, %s, %s, %s)',
+                [(product.pk, *self.document(product)) for product in Product.objects.iterator()]
+            )
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    Backend using the `products_product_search` tsvector table (GIN indexed)
+    created by the migrations, ranked with `ts_rank`.
+    """
+
+    table = 'products_product_search'
+    vector = (
+        "setweight(to_tsvector('english', %s), 'A') || "
+        "setweight(to_tsvector('english', %s), 'C') || "
+        "setweight(to_tsvector('english', %s), 'B')"
+    )
+
+    def match(self, query):
+        """Builds a tsquery where every token is a prefix that has to match"""
+
+        return ' & '.join(f'{token}:*' for token in tokenize(query))
+
+    def search(self, queryset, query):
+        match = self.match(query)
+
+        if not match:
+            return self.no_results(queryset)
+
+        return queryset.filter(
+            pk__in=RawSQL(
+                f"SELECT product_id FROM {self.table} WHERE document @@ to_tsquery('english', %s)", [match])
+        ).annotate(rank=RawSQL(
+            f"SELECT -ts_rank(document, to_tsquery('english', %s)) FROM {self.table} "
+            f"WHERE product_id = products_product.id",
+            [match],
+            output_field=FloatField(),
+        ))
+
+    def index(self, product):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {self.table} (product_id, document) VALUES (%s, {self.vector}) '
+                f'ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document',
+                [product.pk, *self.document(product)]
+            )
+
+    def remove(self, product_pk):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE product_id = %s', [product_pk])
+
+    def rebuild(self):
+        from products.models import Product
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+        for product in Product.objects.iterator():
+            self.index(product)
+
+
+vendor_backends = {
+    'sqlite': 'products.search.SQLiteSearchBackend',
+    'postgresql': 'products.search.PostgresSearchBackend',
+}
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    """
+    Returns the backend named by `settings.PRODUCT_SEARCH_BACKEND`, or the one
+    matching the database vendor when it's not set.
+    """
+
+    path = getattr(settings, 'PRODUCT_SEARCH_BACKEND', None) or vendor_backends.get(
+        connection.vendor, 'products.search.InMemorySearchBackend')
+
+    return import_string(path)()
@@ -0,0 +1,34 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from products.models import Product
+from products.cache import bump_versions
+from products.tasks import schedule_variants
+from products.engine import catalog_index, catalog_suggestions
+from products.search import get_search_backend
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    """Signal which keeps the product in the search index post_save"""
+
+    get_search_backend().index(instance)
+    bump_versions(*instance.get_cache_versions())
+    schedule_variants(instance)
+
+    # The in-process indexes can't be rolled back, so they only see committed products
+    transaction.on_commit(lambda: catalog_index.index(instance))
+    transaction.on_commit(lambda: catalog_suggestions.index(instance))
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    """Signal which removes the product from the search index post_delete"""
+
+    get_search_backend().remove(instance.pk)
+    bump_versions(*instance.get_cache_versions())
+
+    pk = instance.pk
+    transaction.on_commit(lambda: catalog_index.unindex(pk))
+    transaction.on_commit(lambda: catalog_suggestions.unindex(pk))
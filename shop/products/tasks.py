@@ -0,0 +1,20 @@
+from products.images import store_variants
+from tasks.queue import task
+
+
+@task(max_attempts=3)
+def generate_logo_variants(model_label, pk):
+    """Encodes the resized copies of a product or associate logo, see `products.images`"""
+
+    store_variants(model_label, pk)
+
+
+def schedule_variants(instance):
+    """Queues the generation of the logo variants of an instance, unless they are up to date"""
+
+    if not instance.logo or instance.logo_variants.get('source') == instance.logo.name:
+        return
+
+    model_label = instance._meta.label
+    generate_logo_variants.delay(
+        model_label, instance.pk, key=f'logo-variants:{model_label}:{instance.pk}:{instance.logo.name}')
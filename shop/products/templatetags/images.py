@@ -0,0 +1,37 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from products.images import formats
+
+register = template.Library()
+
+
+def srcset(storage, variants):
+    return ', '.join(f'{storage.url(name)} {width}w' for width, name in variants.items())
+
+
+@register.simple_tag
+def picture(image, variants, sizes='100vw', **attrs):
+    """
+    Renders a <picture> of an image with the resized copies of `products.images`,
+    a plain <img> of the original until they are generated.
+
+    `{% picture product.logo product.logo_variants sizes='300px' class='img-fluid' %}`
+    """
+
+    attributes = format_html_join(' ', '{}="{}"', attrs.items())
+    fallback, *others = formats
+
+    if fallback not in variants:
+        return format_html('<img src="{}" {} />', image.url, attributes)
+
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" {} /></picture>',
+        format_html_join('', '<source type="image/{}" srcset="{}" sizes="{}" />', (
+            (name, srcset(image.storage, variants[name]), sizes) for name in others if name in variants
+        )),
+        image.storage.url(min(variants[fallback].items(), key=lambda item: int(item[0]))[1]),
+        srcset(image.storage, variants[fallback]),
+        sizes,
+        attributes,
+    )
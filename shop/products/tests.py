@@ -1,13 +1,24 @@
 import tempfile
 import datetime
+from io import BytesIO, StringIO
+from PIL import Image
+from django.core.cache import cache
+from django.db import models
+from django.core.management import call_command
 from django.utils import timezone
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 
-from products.models import Product
-from associates.models import Associate
+from products import counters
+from products.models import Product, ProductSalesShard
+from products.catalog import Catalog
+from products.engine import InvertedIndex, SuggestionIndex, catalog_index
+from products.search import get_search_backend
+from associates.models import Associate, AssociateSalesShard
 from users.models import User
+from tasks.models import Task
+from tasks.queue import run_pending
 
 
 class TestProductModel(TestCase):
@@ -55,3 +66,913 @@ class TestProductModel(TestCase):
         self.assertEqual(product.owner, self.associate  )
         self.assertEqual(product.holding, 'San Francisco')
         self.assertEqual(product.sales, 0)
+
+
+class TestProductPagination(TestCase):
+    """Test class for the keyset pagination of the catalog views"""
+
+    def setUp(self):
+        """Sets up enough products for several pages"""
+
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(b'Test image.')
+            f.flush()
+            test_image = SimpleUploadedFile('test_image.png', f.read())
+
+        user = User.objects.create(email='user@test.com', password='T@st123', is_associate=True)
+
+        self.associate = Associate.objects.create(
+            name='Testing co.',
+            description='Testing Co\Testing\nDescription',
+            owner = user,
+            logo = test_image,
+            website = 'test.com',
+            location='France',
+            slug='test-slug',
+        )
+
+        product = Product.objects.create(
+            name='TestProduct',
+            description='Test\nProduct\nDescription',
+            logo=test_image,
+            price='99.99',
+            category='food',
+            owner=self.associate,
+            holding='San Francisco',
+        )
+
+        Product.objects.bulk_create([
+            Product(
+                name=f'TestProduct {i}',
+                description='Test\nProduct\nDescription',
+                logo=product.logo.name,
+                price=i,
+                category='food' if i % 2 else 'kitchen',
+                owner=self.associate,
+                holding='San Francisco',
+            ) for i in range(44)
+        ])
+
+        # Shares pub_dates between products so the pk tiebreaker is exercised
+        for i, pk in enumerate(Product.objects.values_list('pk', flat=True)):
+            Product.objects.filter(pk=pk).update(
+                pub_date=timezone.now() - datetime.timedelta(days=i // 5))
+
+        # `bulk_create` skips the signals which keep the search index up to date
+        get_search_backend().rebuild()
+
+    def walk(self, url):
+        """Follows the next links of a paginated view and returns the visited products"""
+
+        client = Client()
+        products = []
+        pages = 0
+
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+            products += [product.pk for product in response.context['product_list']]
+            page = response.context['page_obj']
+            url = page.next_url and response.request['PATH_INFO'] + page.next_url
+            pages += 1
+
+        return products, pages
+
+    def test_index_pagination(self):
+        """Tests that walking the index pages visits every product once, in order"""
+
+        products, pages = self.walk(reverse('products:index'))
+        expected = list(Product.objects.order_by('-pub_date', '-pk').values_list('pk', flat=True))
+
+        self.assertEqual(products, expected)
+        self.assertEqual(pages, 3)
+
+    def test_category_pagination(self):
+        """Tests that the category pages only walk the requested category"""
+
+        products, _ = self.walk(reverse('products:category', args=['kitchen']))
+        expected = list(
+            Product.objects.filter(category='kitchen').order_by('-pub_date', '-pk').values_list('pk', flat=True))
+
+        self.assertEqual(products, expected)
+
+    def test_search_pagination_keeps_query(self):
+        """Tests that the page links keep the search query"""
+
+        response = Client().get(reverse('products:search'), {'q': 'TestProduct'})
+
+        self.assertIn('q=TestProduct', response.context['page_obj'].next_url)
+
+    def test_search_pagination(self):
+        """Tests that walking the ranked search pages visits every match once"""
+
+        products, pages = self.walk(reverse('products:search') + '?q=TestProduct')
+
+        self.assertEqual(sorted(products), sorted(Product.objects.values_list('pk', flat=True)))
+        self.assertEqual(pages, 3)
+
+    def test_previous_page(self):
+        """Tests that the previous link of the second page leads back to the first page"""
+
+        client = Client()
+        url = reverse('products:index')
+
+        first = client.get(url)
+        second = client.get(url + first.context['page_obj'].next_url)
+        back = client.get(url + second.context['page_obj'].previous_url)
+
+        self.assertEqual(
+            [product.pk for product in back.context['product_list']],
+            [product.pk for product in first.context['product_list']],
+        )
+        self.assertFalse(first.context['page_obj'].has_previous())
+
+    def test_invalid_cursor(self):
+        """Tests that a tampered cursor returns a 404"""
+
+        response = Client().get(reverse('products:index'), {'after': 'not-a-cursor'})
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_constant_page_queries(self):
+        """Tests that a deep page costs as many queries as the first one"""
+
+        client = Client()
+        url = reverse('products:index')
+        first = client.get(url)
+        second = client.get(url + first.context['page_obj'].next_url)
+
+        # The page, the facet counts and the carousel, without the page cache
+        cache.clear()
+        with self.assertNumQueries(3):
+            client.get(url)
+
+        cache.clear()
+        with self.assertNumQueries(3):
+            client.get(url + second.context['page_obj'].next_url)
+
+    def test_sorted_filtered_pagination(self):
+        """Tests walking the pages of a filtered catalog sorted by price"""
+
+        products, _ = self.walk(reverse('products:index') + '?sort=-price&max_price=30&category=kitchen')
+        expected = list(
+            Product.objects.filter(price__lte=30, category='kitchen')
+            .order_by('-price', '-pk').values_list('pk', flat=True))
+
+        self.assertEqual(products, expected)
+
+
+class TestProductSearch(TestCase):
+    """Test class for the product search backend and ProductSearchView"""
+
+    def setUp(self):
+        """Sets up products for searching"""
+
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(b'Test image.')
+            f.flush()
+            self.test_image = SimpleUploadedFile('test_image.png', f.read())
+
+        user = User.objects.create(email='user@test.com', password='T@st123', is_associate=True)
+
+        self.associate = Associate.objects.create(
+            name='Testing co.',
+            description='Testing Co\Testing\nDescription',
+            owner = user,
+            logo = self.test_image,
+            website = 'test.com',
+            location='France',
+            slug='test-slug',
+        )
+
+        self.kettle = self.create_product('Electric kettle', 'Boils water fast', 'kitchen')
+        self.toaster = self.create_product('Toaster', 'Pairs well with an electric kettle', 'kitchen')
+        self.shirt = self.create_product('Linen shirt', 'Light summer shirt', 'clothing')
+
+    def create_product(self, name, description, category):
+        return Product.objects.create(
+            name=name,
+            description=description,
+            logo=self.test_image,
+            price='9.99',
+            category=category,
+            owner=self.associate,
+            holding='San Francisco',
+        )
+
+    def search(self, query):
+        response = Client().get(reverse('products:search'), {'q': query})
+        return [product.pk for product in response.context['product_list']]
+
+    def test_ranked_results(self):
+        """Tests that name matches rank above description matches"""
+
+        self.assertEqual(self.search('kettle'), [self.kettle.pk, self.toaster.pk])
+
+    def test_prefix_and_description_match(self):
+        """Tests prefix matching over names, descriptions and categories"""
+
+        self.assertEqual(self.search('summ'), [self.shirt.pk])
+        self.assertEqual(self.search('ele ket'), [self.kettle.pk, self.toaster.pk])
+        self.assertEqual(set(self.search('kitchen')), {self.kettle.pk, self.toaster.pk})
+
+    def test_punctuation_query(self):
+        """Tests that a query without any searchable term renders an empty page"""
+
+        for query in ('%%', '!'):
+            response = Client().get(reverse('products:search'), {'q': query})
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(list(response.context['product_list']), [])
+
+    def test_index_follows_changes(self):
+        """Tests that saving and deleting products updates the index"""
+
+        self.shirt.name = 'Linen trousers'
+        self.shirt.save()
+
+        self.assertEqual(self.search('trousers'), [self.shirt.pk])
+
+        self.shirt.delete()
+
+        self.assertEqual(self.search('linen'), [])
+
+    def test_rebuild_command(self):
+        """Tests that the management command rebuilds the index"""
+
+        Product.objects.filter(pk=self.kettle.pk).update(name='Kettle deluxe')
+
+        call_command('rebuild_search_index', stdout=StringIO())
+
+        self.assertEqual(self.search('deluxe'), [self.kettle.pk])
+
+
+class TestInvertedIndex(TestCase):
+    """Test class for the in-process search engine"""
+
+    def setUp(self):
+        """Sets up an index of a few documents"""
+
+        self.index = InvertedIndex()
+        self.index.build([
+            (1, 'Electric kettle', 'Boils water fast', 'kitchen', 'SF'),
+            (2, 'Toaster', 'Pairs well with an electric kettle', 'kitchen', 'LA'),
+            (3, 'Linen shirt', 'Light summer shirt', 'clothing', 'SF'),
+        ])
+
+    def test_bm25_ranking(self):
+        """Tests that name matches rank above description matches"""
+
+        self.assertEqual(self.index.search('kettle').ids, [1, 2])
+        self.assertEqual(self.index.search('electric kettle').ids, [1, 2])
+
+    def test_prefix_and_all_tokens(self):
+        """Tests that every query token has to match as a prefix"""
+
+        self.assertEqual(self.index.search('summ').ids, [3])
+        self.assertEqual(self.index.search('ket wat').ids, [1])
+        self.assertEqual(self.index.search('kettle shirt').ids, [])
+        self.assertEqual(self.index.search('  ').ids, [])
+
+    def test_facets_and_filters(self):
+        """Tests facet counts over every match and the category and holding filters"""
+
+        result = self.index.search('kettle', holding='LA')
+
+        self.assertEqual(result.ids, [2])
+        self.assertEqual(result.total, 1)
+        self.assertEqual(result.facets, {'categories': {'kitchen': 2}, 'holdings': {'SF': 1, 'LA': 1}})
+        self.assertEqual(self.index.search('kitchen', category='clothing').ids, [])
+
+    def test_incremental_updates(self):
+        """Tests adding, replacing and removing single documents"""
+
+        self.index.add(4, 'Kettle deluxe', 'Steel', 'kitchen', 'NY')
+        self.assertEqual(self.index.search('deluxe').ids, [4])
+
+        self.index.add(1, 'Coffee grinder', 'Grinds beans', 'kitchen', 'SF')
+        self.assertEqual(self.index.search('kettle').ids, [4, 2])
+
+        self.index.remove(4)
+        self.index.remove(4)
+        self.assertEqual(self.index.search('kettle').ids, [2])
+        self.assertEqual(self.index.search('deluxe').ids, [])
+        self.assertNotIn('deluxe', self.index.terms)
+        self.assertEqual(len(self.index), 3)
+
+    def test_limit(self):
+        """Tests that the limit keeps the best matches and the total counts all of them"""
+
+        result = self.index.search('kitchen', limit=1)
+
+        self.assertEqual(len(result.ids), 1)
+        self.assertEqual(result.total, 2)
+
+
+class TestCatalogIndex(TestProductSearch):
+    """Test class for the catalog index following the Product table"""
+
+    def setUp(self):
+        super(TestCatalogIndex, self).setUp()
+        catalog_index.load()
+
+    def test_signals_update_on_commit(self):
+        """Tests that saved and deleted products reach the index once committed"""
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.shirt.name = 'Linen trousers'
+            self.shirt.save()
+
+        self.assertEqual(catalog_index.search('trousers').ids, [self.shirt.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.shirt.delete()
+
+        self.assertEqual(catalog_index.search('linen').ids, [])
+
+    @override_settings(PRODUCT_SEARCH_BACKEND='products.search.InMemorySearchBackend')
+    def test_search_view_no_match(self):
+        """Tests that the search page renders a query the index doesn't match with the in-memory backend"""
+
+        get_search_backend.cache_clear()
+        self.addCleanup(get_search_backend.cache_clear)
+
+        response = Client().get(reverse('products:search'), {'q': 'zzzz'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['product_list']), [])
+
+    def test_search_view_facets(self):
+        """Tests that the search page lists the facet counts of the matches"""
+
+        response = Client().get(reverse('products:search'), {'q': 'kettle'})
+
+        self.assertEqual(response.context['category_facets'], [('Kitchen', 2)])
+
+
+class TestSuggestionIndex(TestCase):
+    """Test class for the typeahead index"""
+
+    def setUp(self):
+        """Sets up an index of a few products"""
+
+        self.index = SuggestionIndex()
+        self.index.build([
+            (1, 'Electric kettle', 5),
+            (2, 'Kettle deluxe', 10),
+            (3, 'Keyboard', 1),
+        ])
+
+    def test_prefix_ranked_by_sales(self):
+        """Tests that any word of a name matches and the best sellers come first"""
+
+        self.assertEqual(self.index.suggest('ke'), [(2, 'Kettle deluxe'), (1, 'Electric kettle'), (3, 'Keyboard')])
+        self.assertEqual(self.index.suggest('KETTLE', limit=1), [(2, 'Kettle deluxe')])
+        self.assertEqual(self.index.suggest('electric ke'), [(1, 'Electric kettle')])
+        self.assertEqual(self.index.suggest('x'), [])
+        self.assertEqual(self.index.suggest(''), [])
+
+    def test_incremental_updates(self):
+        """Tests adding, replacing and removing products"""
+
+        self.index.add(4, 'Kettlebell', 20)
+        self.index.add(2, 'Coffee grinder', 10)
+        self.index.remove(1)
+        self.index.remove(1)
+
+        self.assertEqual(self.index.suggest('ket'), [(4, 'Kettlebell')])
+        self.assertEqual(self.index.suggest('grind'), [(2, 'Coffee grinder')])
+        self.assertEqual(len(self.index.entries), 4)
+
+
+class TestCatalog(TestCase):
+    """Test class for the faceted filtering and sorting of the catalog"""
+
+    def setUp(self):
+        """Sets up products across categories and holdings"""
+
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(b'Test image.')
+            f.flush()
+            test_image = SimpleUploadedFile('test_image.png', f.read())
+
+        user = User.objects.create(email='user@test.com', password='T@st123', is_associate=True)
+
+        associate = Associate.objects.create(
+            name='Testing co.',
+            description='Testing Co\Testing\nDescription',
+            owner = user,
+            logo = test_image,
+            website = 'test.com',
+            location='France',
+            slug='test-slug',
+        )
+
+        self.bread, self.pan, self.kettle, self.shirt = Product.objects.bulk_create([
+            Product(name=name, description='Description', logo='test_image.png', owner=associate,
+                    category=category, holding=holding, price=price, count=count, sales=sales)
+            for name, category, holding, price, count, sales in (
+                ('Bread', 'food', 'SF', 3, 10, 50),
+                ('Pan', 'kitchen', 'SF', 25, 0, 5),
+                ('Kettle', 'kitchen', 'LA', 40, 3, 20),
+                ('Shirt', 'clothing', 'LA', 15, 1, 0),
+            )
+        ])
+
+    def products(self, data, category=None):
+        catalog = Catalog(data, category)
+        return list(catalog.filter(Product.objects.order_by(*catalog.get_ordering())))
+
+    def test_filters_and_sorts(self):
+        """Tests every filter and sort of the catalog"""
+
+        self.assertEqual(self.products({'holding': 'LA', 'sort': 'price'}), [self.shirt, self.kettle])
+        self.assertEqual(self.products({'min_price': '10', 'max_price': '30', 'sort': '-price'}), [self.pan, self.shirt])
+        self.assertEqual(self.products({'in_stock': 'on', 'sort': 'sales'}), [self.bread, self.kettle, self.shirt])
+        self.assertEqual(self.products({'sort': 'sales'}, category='kitchen'), [self.kettle, self.pan])
+
+    def test_invalid_filters_are_ignored(self):
+        """Tests that invalid filters are reported and left out"""
+
+        catalog = Catalog({'holding': 'Mars', 'min_price': 'cheap', 'category': 'food'})
+
+        self.assertEqual(set(catalog.errors), {'holding', 'min_price'})
+        self.assertEqual(list(catalog.filter(Product.objects.all())), [self.bread])
+
+    def test_facets_in_one_query(self):
+        """Tests that facets count every filter but their own, in a single query"""
+
+        catalog = Catalog({'category': 'kitchen', 'holding': 'SF'})
+
+        with self.assertNumQueries(1):
+            facets = catalog.facets(Product.objects.all())
+
+        self.assertEqual(facets['total'], 1)
+        self.assertEqual(facets['categories'], {'food': 1, 'kitchen': 1, 'electronics': 0, 'clothing': 0})
+        self.assertEqual(facets['holdings']['SF'], 1)
+        self.assertEqual(facets['holdings']['LA'], 1)
+        self.assertEqual(facets['in_stock'], 0)
+
+    def test_category_view(self):
+        """Tests that the category pages take the filters from the query string"""
+
+        response = Client().get(reverse('products:category', args=['kitchen']), {'in_stock': 'on'})
+
+        self.assertEqual(list(response.context['product_list']), [self.kettle])
+        self.assertIn(('LA', 'Los Angeles', 1), response.context['holding_facets'])
+
+
+class TestSalesCounters(TestCase):
+    """Test class for the striped sales counters of products.counters"""
+
+    def setUp(self):
+        """Sets up a product with compacted sales and an empty cache"""
+
+        cache.clear()
+
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(b'Test image.')
+            f.flush()
+            test_image = SimpleUploadedFile('test_image.png', f.read())
+
+        user = User.objects.create(email='user@test.com', password='T@st123', is_associate=True)
+
+        self.associate = Associate.objects.create(
+            name='Testing co.',
+            description='Testing Co\Testing\nDescription',
+            owner = user,
+            logo = test_image,
+            website = 'test.com',
+            location='France',
+            slug='test-slug',
+        )
+
+        self.product = Product.objects.create(
+            name='TestProduct',
+            description='Test\nProduct\nDescription',
+            logo=test_image,
+            price='99.99',
+            category='food',
+            owner=self.associate,
+            holding='San Francisco',
+            sales=10,
+        )
+
+    def test_add_sales(self):
+        """Tests that sales spread over the shards and add up with the column"""
+
+        with override_settings(SALES_COUNTER_SHARDS=4):
+            for _ in range(40):
+                # INSERT the missing shard, UPDATE it
+                with self.assertNumQueries(2):
+                    counters.add_sales(Product, {self.product.pk: 2})
+
+        shards = ProductSalesShard.objects.filter(product=self.product)
+        self.assertLessEqual(shards.count(), 4)
+        self.assertGreater(shards.count(), 1)
+        self.assertEqual(sum(shards.values_list('count', flat=True)), 80)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).sales, 10)
+        self.assertEqual(counters.get_sales(Product, [self.product.pk]), {self.product.pk: 90})
+
+    def test_get_sales_cached(self):
+        """Tests that totals are served from the cache until it expires"""
+
+        self.assertEqual(counters.get_sales(Product, [self.product.pk]), {self.product.pk: 10})
+        counters.add_sales(Product, {self.product.pk: 5})
+
+        with self.assertNumQueries(0):
+            self.assertEqual(counters.get_sales(Product, [self.product.pk]), {self.product.pk: 10})
+
+        cache.clear()
+        self.assertEqual(counters.get_sales(Product, [self.product.pk]), {self.product.pk: 15})
+
+    def test_compact(self):
+        """Tests that compacting folds the shards into the columns without changing the totals"""
+
+        for _ in range(10):
+            counters.add_sales(Product, {self.product.pk: 3})
+            counters.add_sales(Associate, {self.associate.pk: 3})
+
+        counters.add_sales(Product, {self.product.pk: -1})
+
+        out = StringIO()
+        call_command('compact_sales', stdout=out)
+
+        self.assertEqual(Product.objects.get(pk=self.product.pk).sales, 39)
+        self.assertEqual(Associate.objects.get(pk=self.associate.pk).sales, 30)
+        self.assertFalse(ProductSalesShard.objects.exclude(count=0).exists())
+        self.assertFalse(AssociateSalesShard.objects.exclude(count=0).exists())
+        self.assertEqual(counters.get_sales(Product, [self.product.pk]), {self.product.pk: 39})
+
+        self.assertEqual(counters.compact(Product), 0)
+
+    def test_compact_nets_shards(self):
+        """Tests that a release in one shard is folded together with the sale it gives back"""
+
+        Product.objects.filter(pk=self.product.pk).update(sales=0)
+        # The release landed in an older shard than the sale
+        ProductSalesShard.objects.bulk_create([
+            ProductSalesShard(product=self.product, shard=0, count=-1),
+            ProductSalesShard(product=self.product, shard=1, count=1),
+        ])
+
+        self.assertEqual(counters.compact(Product, batch_size=1), 2)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).sales, 0)
+        self.assertFalse(ProductSalesShard.objects.exclude(count=0).exists())
+
+
+class TestAnonymousPageCache(TestCase):
+    """Test class for the cached catalog pages of anonymous visitors"""
+
+    def setUp(self):
+        """Sets up a product and an empty cache"""
+
+        cache.clear()
+
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(b'Test image.')
+            f.flush()
+            test_image = SimpleUploadedFile('test_image.png', f.read())
+
+        self.user = User.objects.create(email='user@test.com', password='T@st123', is_associate=True)
+
+        self.associate = Associate.objects.create(
+            name='Testing co.',
+            description='Testing Co\Testing\nDescription',
+            owner = self.user,
+            logo = test_image,
+            website = 'test.com',
+            location='France',
+            slug='test-slug',
+        )
+
+        self.product = Product.objects.create(
+            name='TestProduct',
+            description='Test\nProduct\nDescription',
+            logo=test_image,
+            price='99.99',
+            category='food',
+            owner=self.associate,
+            holding='SF',
+        )
+
+    def test_pages_are_cached(self):
+        """Tests that repeated anonymous visits are served without queries"""
+
+        client = Client()
+
+        # Detail pages still look their validators up for conditional GETs
+        for url, queries in (
+            (reverse('products:index'), 0),
+            (reverse('products:category', args=['food']) + '?sort=price', 0),
+            (reverse('products:details', args=[self.product.pk]), 1),
+            (reverse('associates:details', args=[self.associate.slug]), 1),
+        ):
+            first = client.get(url)
+
+            with self.assertNumQueries(queries):
+                second = client.get(url)
+
+            self.assertEqual(first.content, second.content)
+            self.assertNotIn('csrftoken', second.cookies)
+
+    def test_saves_invalidate_pages(self):
+        """Tests that saving products and associates invalidates the pages showing them"""
+
+        client = Client()
+        index = reverse('products:index')
+        details = reverse('products:details', args=[self.product.pk])
+        associate = reverse('associates:details', args=[self.associate.slug])
+
+        for url in (index, details, associate):
+            client.get(url)
+
+        self.product.name = 'Renamed product'
+        self.product.save()
+
+        for url in (index, details, associate):
+            self.assertContains(client.get(url), 'Renamed product')
+
+        self.associate.name = 'Renamed co.'
+        self.associate.save()
+
+        self.assertContains(client.get(details), 'Renamed co.')
+        self.assertContains(client.get(associate), 'Renamed co.')
+
+    def test_authenticated_pages_are_not_cached(self):
+        """Tests that logged in users always get a fresh page"""
+
+        client = Client()
+        client.force_login(self.user)
+        url = reverse('products:details', args=[self.product.pk])
+
+        client.get(url)
+        response = client.get(url)
+
+        self.assertIsNotNone(response.context)
+        self.assertContains(response, 'Add to cart')
+
+
+class TestFragmentCache(TestCase):
+    """Test class for the cached product cards and carousel"""
+
+    def setUp(self):
+        """Sets up a product and an empty cache"""
+
+        cache.clear()
+
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(b'Test image.')
+            f.flush()
+            test_image = SimpleUploadedFile('test_image.png', f.read())
+
+        self.user = User.objects.create(email='user@test.com', password='T@st123', is_associate=True)
+
+        self.associate = Associate.objects.create(
+            name='Testing co.',
+            description='Testing Co\Testing\nDescription',
+            owner = self.user,
+            logo = test_image,
+            website = 'test.com',
+            location='France',
+            slug='test-slug',
+        )
+
+        self.product = Product.objects.create(
+            name='TestProduct',
+            description='Test\nProduct\nDescription',
+            logo=test_image,
+            price='99.99',
+            category='food',
+            owner=self.associate,
+            holding='SF',
+        )
+
+    def get_index(self):
+        # Logged in users skip the page cache, so only the fragments are cached
+        client = Client()
+        client.force_login(self.user)
+
+        return client.get(reverse('products:index'))
+
+    def test_cards_follow_versions(self):
+        """Tests that cards are only rendered again once their product is saved"""
+
+        self.get_index()
+
+        Product.objects.filter(pk=self.product.pk).update(name='Silently renamed')
+        self.assertNotContains(self.get_index(), 'Silently renamed')
+
+        product = Product.objects.get(pk=self.product.pk)
+        product.save(update_fields=['price'])
+
+        self.assertEqual(Product.objects.get(pk=self.product.pk).version, 2)
+        self.assertContains(self.get_index(), 'Silently renamed')
+
+    def test_stale_save_bumps_version(self):
+        """Tests that saving a stale instance still moves the version past every other bump"""
+
+        stale = Product.objects.get(pk=self.product.pk)
+        Product.objects.filter(pk=self.product.pk).update(version=models.F('version') + 1)
+
+        stale.save()
+
+        self.assertEqual(stale.version, 3)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).version, 3)
+
+    def test_carousel_follows_new_products(self):
+        """Tests that publishing a product renders the carousel again"""
+
+        self.get_index()
+
+        newer = Product.objects.create(
+            name='Newer product',
+            description='Description',
+            logo=self.product.logo.name,
+            price='1.00',
+            category='food',
+            owner=self.associate,
+            holding='SF',
+        )
+
+        self.assertContains(self.get_index(), reverse('products:details', args=[newer.pk]), count=2)
+
+
+class TestConditionalGet(TestCase):
+    """Test class for the ETag and Last-Modified headers of the detail pages"""
+
+    def setUp(self):
+        """Sets up a product"""
+
+        cache.clear()
+
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(b'Test image.')
+            f.flush()
+            test_image = SimpleUploadedFile('test_image.png', f.read())
+
+        self.user = User.objects.create(email='user@test.com', password='T@st123', is_associate=True)
+
+        self.associate = Associate.objects.create(
+            name='Testing co.',
+            description='Testing Co\Testing\nDescription',
+            owner = self.user,
+            logo = test_image,
+            website = 'test.com',
+            location='France',
+            slug='test-slug',
+        )
+
+        self.product = Product.objects.create(
+            name='TestProduct',
+            description='Test\nProduct\nDescription',
+            logo=test_image,
+            price='99.99',
+            category='food',
+            owner=self.associate,
+            holding='SF',
+        )
+
+    def test_not_modified(self):
+        """Tests that matching validators get a 304 without rendering the page"""
+
+        client = Client()
+
+        for url in (
+            reverse('products:details', args=[self.product.pk]),
+            reverse('associates:details', args=[self.associate.slug]),
+        ):
+            response = client.get(url)
+            self.assertIn('ETag', response)
+            self.assertIn('Last-Modified', response)
+
+            with self.assertNumQueries(1):
+                self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+            response = client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+            self.assertEqual(response.status_code, 304)
+
+    def test_changes_update_validators(self):
+        """Tests that the owner and the products are part of the validators"""
+
+        product = reverse('products:details', args=[self.product.pk])
+        associate = reverse('associates:details', args=[self.associate.slug])
+        etags = {url: Client().get(url)['ETag'] for url in (product, associate)}
+
+        self.associate.save()
+        self.assertNotEqual(Client().get(product)['ETag'], etags[product])
+
+        etags[associate] = Client().get(associate)['ETag']
+        self.product.delete()
+        self.assertNotEqual(Client().get(associate)['ETag'], etags[associate])
+
+    def test_missing_and_authenticated(self):
+        """Tests that missing objects 404 and logged in users skip the validators"""
+
+        self.assertEqual(Client().get(reverse('products:details', args=[0])).status_code, 404)
+
+        client = Client()
+        client.force_login(self.user)
+
+        self.assertNotIn('ETag', client.get(reverse('products:details', args=[self.product.pk])))
+
+
+@override_settings(IMAGE_VARIANT_WIDTHS=(300, 600))
+class TestImageVariants(TestCase):
+    """Test class for the resized copies of the uploaded logos"""
+
+    def setUp(self):
+        """Sets up an associate and a real image"""
+
+        cache.clear()
+
+        buffer = BytesIO()
+        Image.new('RGB', (800, 400), 'red').save(buffer, 'PNG')
+        self.image = SimpleUploadedFile('test_image.png', buffer.getvalue())
+
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(b'Test image.')
+            f.flush()
+            self.invalid_image = SimpleUploadedFile('test_image.png', f.read())
+
+        self.user = User.objects.create(email='user@test.com', password='T@st123', is_associate=True)
+
+        self.associate = Associate.objects.create(
+            name='Testing co.',
+            description='Testing Co\Testing\nDescription',
+            owner = self.user,
+            logo = self.invalid_image,
+            website = 'test.com',
+            location='France',
+            slug='test-slug',
+        )
+
+    def create_product(self, logo):
+        product = Product.objects.create(
+            name='TestProduct',
+            description='Test\nProduct\nDescription',
+            logo=logo,
+            price='99.99',
+            category='food',
+            owner=self.associate,
+            holding='SF',
+        )
+
+        run_pending()
+        return Product.objects.get(pk=product.pk)
+
+    def test_variants_are_generated(self):
+        """Tests that every format and width is stored under a content hashed name"""
+
+        product = self.create_product(self.image)
+        variants = product.logo_variants
+
+        self.assertEqual(variants['source'], product.logo.name)
+        self.assertEqual(set(variants['webp']), {'300', '600'})
+
+        for name in ('jpeg', 'webp'):
+            for width, path in variants[name].items():
+                self.assertTrue(product.logo.storage.exists(path))
+                self.assertRegex(path, rf'\.{width}\.[0-9a-f]{{12}}\.(jpg|webp)$')
+
+                with product.logo.storage.open(path) as f:
+                    self.assertEqual(Image.open(f).width, int(width))
+
+        # Storing the variants renders the cached cards again
+        self.assertEqual(product.version, 2)
+
+        response = Client().get(reverse('products:index'))
+        self.assertContains(response, '<source type="image/webp"')
+        self.assertContains(response, variants['webp']['300'])
+
+    def test_invalid_images(self):
+        """Tests that unreadable images keep the original in templates"""
+
+        product = self.create_product(self.invalid_image)
+
+        self.assertEqual(product.logo_variants, {'source': product.logo.name})
+        self.assertNotContains(Client().get(reverse('products:index')), '<picture>')
+
+    def test_generation_is_queued(self):
+        """Tests that uploads only queue the generation, once per logo"""
+
+        product = Product.objects.create(
+            name='TestProduct',
+            description='Test\nProduct\nDescription',
+            logo=self.image,
+            price='99.99',
+            category='food',
+            owner=self.associate,
+            holding='SF',
+        )
+        product.save()
+
+        # The associate's logo is queued as well
+        task = Task.objects.get(key__startswith='logo-variants:products.Product:')
+        self.assertEqual(task.name, 'products.tasks.generate_logo_variants')
+        self.assertEqual(task.args, ['products.Product', product.pk])
+        self.assertEqual(Product.objects.get(pk=product.pk).logo_variants, {})
+
+        self.assertEqual(run_pending(), 2)
+        self.assertIn('webp', Product.objects.get(pk=product.pk).logo_variants)
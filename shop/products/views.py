@@ -6,7 +6,12 @@ from django.shortcuts import redirect
 from django.urls import reverse
 
 from products.models import Product
+from products.datasets import categories, holdings
 from products.forms import ProductCreateForm
+from products.cache import AnonymousPageCacheMixin, ConditionalPageMixin
+from products.catalog import Catalog
+from products.pagination import KeysetPaginationMixin
+from products.search import get_search_backend
 from associates.models import Associate
 
 
@@ -37,11 +42,38 @@ class ProductCreateView(CreateView):
             return super(ProductCreateView, self).dispatch(request, *args, **kwargs)
 
 
-class ProductListView(ListView):
+class CatalogMixin:
+    """Filters, sorts and facets a Product ListView by the query string, see `products.catalog`"""
+
+    def get_catalog(self):
+        if not hasattr(self, 'catalog'):
+            self.catalog = Catalog(self.request.GET, self.kwargs.get('category'))
+
+        return self.catalog
+
+    def get_ordering(self):
+        return self.get_catalog().get_ordering()
+
+    def get_queryset(self):
+        return self.get_catalog().filter(super(CatalogMixin, self).get_queryset())
+
+    def get_context_data(self, **kwargs):
+        data = super(CatalogMixin, self).get_context_data(**kwargs)
+
+        catalog = self.get_catalog()
+        facets = catalog.facets(Product.objects.all())
+
+        data['catalog_form'] = catalog.form
+        data['facets'] = facets
+        data['category_facets'] = [(key, label, facets['categories'][key]) for key, label in categories]
+        data['holding_facets'] = [(key, label, facets['holdings'][key]) for key, label in holdings]
+        return data
+
+
+class ProductListView(AnonymousPageCacheMixin, CatalogMixin, KeysetPaginationMixin, ListView):
     """Basic ListView for the Product model"""
 
     model = Product
-    ordering = ['-pub_date', '-pk']
     template_name = 'products/index.html'
 
     def get_context_data(self, **kwargs):
@@ -51,33 +83,37 @@ class ProductListView(ListView):
 
         # Adds a list of three last products to the index page so that we can view them in the carousel
         data['carousel'] = products[:3]
+        # The carousel fragment stays cached until a newer product is published or one of them changes
+        data['carousel_key'] = '-'.join(f'{product.pk}.{product.version}' for product in data['carousel'])
         return data
 
 
-class ProductDetailView(DetailView):
+class ProductDetailView(ConditionalPageMixin, AnonymousPageCacheMixin, DetailView):
     """Basic DetailView for the Product model"""
 
     model = Product
     template_name = 'products/details.html'
 
+    def get_cache_versions(self):
+        return [f'product:{self.kwargs["pk"]}']
+
+    def get_conditional_values(self):
+        return Product.objects.filter(pk=self.kwargs['pk']).values_list(
+            'updated_at', 'owner__updated_at').first()
+
 
-class ProductCategoryListView(ListView):
-    """Basic ListView for categories of the shop"""
+class ProductCategoryListView(AnonymousPageCacheMixin, CatalogMixin, KeysetPaginationMixin, ListView):
+    """Basic ListView for categories of the shop, the category comes from the URL"""
 
     model = Product
     template_name = 'products/category.html'
-
-    def get_queryset(self):
-        queryset = super(ProductCategoryListView, self).get_queryset()
-        category = self.kwargs['category']
-        queryset = queryset.filter(category=category)
-        return queryset
     
 
-class ProductSearchView(ListView):
-    """Basic ListView for searching for a Product"""
+class ProductSearchView(KeysetPaginationMixin, ListView):
+    """ListView for searching for a Product, ranked by the search backend"""
 
     model = Product
+    ordering = ['rank', '-pk']
     template_name = 'products/search.html'
 
     def dispatch(self, request, *args, **kwargs):
@@ -89,4 +125,18 @@ class ProductSearchView(ListView):
 
     def get_queryset(self):
         query = self.request.GET.get('q')
-        return Product.objects.filter(name__icontains=query)
+        return get_search_backend().search(Product.objects.all(), query)
+
+    def get_context_data(self, **kwargs):
+        data = super(ProductSearchView, self).get_context_data(**kwargs)
+
+        facets = get_search_backend().facets(Product.objects.all(), self.request.GET.get('q'))
+
+        # Facet counts of every match as `(label, count)`, in the order of `products.datasets`
+        data['category_facets'] = [
+            (label, facets['category'][key]) for key, label in categories if key in facets['category']
+        ]
+        data['holding_facets'] = [
+            (label, facets['holding'][key]) for key, label in holdings if key in facets['holding']
+        ]
+        return data
@@ -47,6 +47,7 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework.authtoken',
     'api',
+    'tasks',
 ]
 
 MIDDLEWARE = [
@@ -72,6 +73,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'carts.context_processors.cart_count',
             ],
         },
     },
@@ -102,9 +104,87 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
-    ]
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.CursorPagination',
+    'PAGE_SIZE': 50,
+}
+
+# Upper bound for the `page_size` query parameter of the API
+API_MAX_PAGE_SIZE = 200
+
+# Seconds the responses of requests with an `Idempotency-Key` are replayed for
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24
+
+
+# Search
+
+# Dotted path of the product search backend, picked from the database vendor when `None`
+PRODUCT_SEARCH_BACKEND = None
+
+# Seconds before the typeahead suggestions reload their sales ranking, see `products.engine.CatalogSuggestions`
+SUGGESTION_RELOAD_INTERVAL = 60 * 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+# `locmem`, `file` or `redis`, the location is a directory for `file` and a URL for `redis`.
+# `locmem` is private to every process: an invalidation only reaches the worker
+# that made it, so deployments running several workers need `file` or `redis`.
+CACHE_BACKEND = os.environ.get('SHOP_CACHE_BACKEND', 'locmem')
+
+CACHE_LOCATION = os.environ.get('SHOP_CACHE_LOCATION')
+
+cache_backends = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'shop'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', os.path.join(BASE_DIR, 'cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379'),
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': cache_backends[CACHE_BACKEND][0],
+        'LOCATION': CACHE_LOCATION or cache_backends[CACHE_BACKEND][1],
+    }
 }
 
+# Cached pages are invalidated by signals, the timeout only bounds their memory.
+# With `locmem` the other workers miss the invalidations, so it also bounds how
+# long they serve a stale page.
+PAGE_CACHE_TIMEOUT = 60 if CACHE_BACKEND == 'locmem' else 60 * 60 * 24
+
+
+# Carts
+
+# Seconds the navbar cart badge count is cached for, see `carts.services.get_cart_count`.
+# Edits bump its version, which with `locmem` only the editing worker sees.
+CART_COUNT_TIMEOUT = 60 if CACHE_BACKEND == 'locmem' else 60 * 60
+
+
+# Counters
+
+# Rows every sales counter is striped over, see `products.counters`
+SALES_COUNTER_SHARDS = 8
+
+# Seconds the summed sales of a product or associate are cached for
+SALES_CACHE_TIMEOUT = 60
+
+
+# Images
+
+# Widths of the resized copies of the uploaded logos, see `products.images`
+IMAGE_VARIANT_WIDTHS = (300, 600, 1200)
+
+IMAGE_VARIANT_QUALITY = 80
+
+
+# Tasks
+
+# Seconds before the first retry of a failed task, doubled on every attempt
+TASK_RETRY_DELAY = 30
+
+# Seconds after which a running task is considered abandoned by its worker
+TASK_LOCK_TIMEOUT = 60 * 10
 
 
 # Database
@@ -0,0 +1,6 @@
+task_statuses = [
+    ('PND', 'Pending'),
+    ('RUN', 'Running'),
+    ('DON', 'Done'),
+    ('FLD', 'Failed'),
+]
@@ -0,0 +1,36 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from tasks.models import Task
+from tasks.queue import run_pending
+
+
+class Command(BaseCommand):
+    help = 'Runs the background tasks of the queue, polling for new ones until stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exits once the queue is empty')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Seconds between polls of an empty queue')
+        parser.add_argument('--purge-days', type=int, default=7, help='Deletes finished tasks older than this')
+
+    def handle(self, *args, **options):
+        while True:
+            ran = run_pending()
+
+            if ran:
+                self.stdout.write(f'Ran {ran} task(s).')
+
+            Task.objects.filter(
+                status='DON',
+                created_at__lt=timezone.now() - datetime.timedelta(days=options['purge_days']),
+            ).delete()
+
+            if options['once']:
+                return
+
+            close_old_connections()
+            time.sleep(options['sleep'])
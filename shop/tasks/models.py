@@ -0,0 +1,33 @@
+from django.db import models
+from django.utils import timezone
+
+from tasks.datasets import task_statuses
+
+
+class Task(models.Model):
+    """A call of a registered `@task` function, run by the `run_tasks` worker, see `tasks.queue`"""
+
+    name = models.CharField(max_length=199)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    # Enqueueing a key that already exists is a no-op
+    key = models.CharField(max_length=255, null=True, blank=True)
+    status = models.CharField(max_length=3, choices=task_statuses, default='PND')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['key'], name='task_unique_key'),
+        ]
+        indexes = [
+            # Backs the claim query of the worker
+            models.Index(fields=['status', 'run_at'], name='task_status_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return ' | '.join((self.name, self.status, str(self.attempts)))
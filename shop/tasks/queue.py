@@ -0,0 +1,133 @@
+import datetime
+import logging
+import traceback
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from tasks.models import Task
+
+logger = logging.getLogger(__name__)
+
+# Dotted name -> function of every `@task`, only these can be run by the worker
+registry = {}
+
+
+def task(func=None, *, max_attempts=5):
+    """
+    Registers a function as a background task and adds `func.delay(*args, key=None, **kwargs)`.
+
+    Arguments must be JSON serializable. Tasks are enqueued in the current
+    transaction, so they only run if it commits, and are retried with an
+    exponential backoff until `max_attempts`.
+    """
+
+    def decorator(func):
+        name = f'{func.__module__}.{func.__name__}'
+        registry[name] = func
+
+        def delay(*args, key=None, **kwargs):
+            enqueue(name, args, kwargs, key=key, max_attempts=max_attempts)
+
+        func.delay = delay
+        return func
+
+    return decorator(func) if func is not None else decorator
+
+
+def enqueue(name, args=(), kwargs=None, key=None, max_attempts=5):
+    """Adds a task to the queue, nothing happens when a task with the same `key` exists"""
+
+    Task.objects.bulk_create([
+        Task(name=name, args=list(args), kwargs=kwargs or {}, key=key, max_attempts=max_attempts)
+    ], ignore_conflicts=True)
+
+
+def claim():
+    """
+    Claims the next due task for this worker, or returns `None`.
+
+    The claim is a conditional UPDATE on the status, so concurrent workers
+    never run the same task twice.
+    """
+
+    now = timezone.now()
+    candidates = Task.objects.filter(status='PND', run_at__lte=now).order_by('run_at', 'pk')
+
+    for pk in candidates.values_list('pk', flat=True)[:10]:
+        if Task.objects.filter(pk=pk, status='PND').update(
+                status='RUN', locked_at=now, attempts=F('attempts') + 1):
+            return Task.objects.get(pk=pk)
+
+    return None
+
+
+def run(task):
+    """Runs a claimed task in a transaction and records its outcome"""
+
+    try:
+        func = registry.get(task.name)
+
+        if func is None:
+            raise LookupError(f'{task.name} is not a registered task.')
+
+        with transaction.atomic():
+            func(*task.args, **task.kwargs)
+
+    except Exception:
+        logger.exception('Task %s (%s) failed', task.pk, task.name)
+
+        if task.attempts < task.max_attempts:
+            status = 'PND'
+            run_at = timezone.now() + datetime.timedelta(
+                seconds=settings.TASK_RETRY_DELAY * 2 ** (task.attempts - 1))
+        else:
+            status, run_at = 'FLD', task.run_at
+
+        Task.objects.filter(pk=task.pk).update(
+            status=status, run_at=run_at, locked_at=None, error=traceback.format_exc())
+        return False
+
+    Task.objects.filter(pk=task.pk).update(status='DON', locked_at=None, error='')
+    return True
+
+
+def requeue_stale():
+    """
+    Puts the tasks of workers which died while running them back in the queue,
+    returns how many were requeued.
+
+    A task which keeps killing its worker, e.g. by running out of memory, is
+    failed once it used its attempts rather than taking down a worker forever.
+    """
+
+    timeout = timezone.now() - datetime.timedelta(seconds=settings.TASK_LOCK_TIMEOUT)
+    stale = Task.objects.filter(status='RUN', locked_at__lt=timeout)
+
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status='FLD', locked_at=None, error='The worker stopped while running the task.')
+
+    if failed:
+        logger.error('Failed %s task(s) which stopped their worker on every attempt', failed)
+
+    return stale.filter(attempts__lt=F('max_attempts')).update(status='PND', locked_at=None)
+
+
+def run_pending(limit=None):
+    """Runs due tasks until the queue is empty or `limit` ran, returns how many ran"""
+
+    requeue_stale()
+    ran = 0
+
+    while limit is None or ran < limit:
+        task = claim()
+
+        if task is None:
+            break
+
+        run(task)
+        ran += 1
+
+    return ran
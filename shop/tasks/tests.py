@@ -0,0 +1,149 @@
+import datetime
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from tasks.models import Task
+from tasks.queue import claim, enqueue, requeue_stale, run, run_pending, task
+from users.models import User
+
+calls = []
+
+
+@task
+def record(value):
+    calls.append(value)
+
+
+@task(max_attempts=2)
+def explode():
+    raise ValueError('Boom')
+
+
+@override_settings(TASK_RETRY_DELAY=30, TASK_LOCK_TIMEOUT=60)
+class TestTaskQueue(TestCase):
+    """Test class for the database backed task queue"""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_delay_and_run(self):
+        """Tests that delayed calls run once, in order"""
+
+        record.delay(1)
+        record.delay(2)
+
+        self.assertEqual(calls, [])
+        self.assertEqual(run_pending(), 2)
+        self.assertEqual(calls, [1, 2])
+        self.assertEqual(set(Task.objects.values_list('status', flat=True)), {'DON'})
+        self.assertEqual(run_pending(), 0)
+
+    def test_idempotency_keys(self):
+        """Tests that a key is only ever enqueued once"""
+
+        record.delay(1, key='record:1')
+        record.delay(1, key='record:1')
+        run_pending()
+        record.delay(1, key='record:1')
+
+        self.assertEqual(Task.objects.count(), 1)
+        self.assertEqual(run_pending(), 0)
+        self.assertEqual(calls, [1])
+
+    def test_claim_is_exclusive(self):
+        """Tests that a claimed task can't be claimed again"""
+
+        record.delay(1)
+
+        claimed = claim()
+
+        self.assertEqual(claimed.status, 'RUN')
+        self.assertEqual(claimed.attempts, 1)
+        self.assertIsNone(claim())
+
+    def test_retries_with_backoff(self):
+        """Tests that failures are retried later and then given up"""
+
+        explode.delay()
+
+        with self.assertLogs('tasks.queue', 'ERROR'):
+            self.assertFalse(run(claim()))
+        failed = Task.objects.get()
+        self.assertEqual(failed.status, 'PND')
+        self.assertIn('Boom', failed.error)
+        self.assertGreater(failed.run_at, timezone.now() + datetime.timedelta(seconds=20))
+        self.assertIsNone(claim())
+
+        Task.objects.update(run_at=timezone.now())
+
+        with self.assertLogs('tasks.queue', 'ERROR'):
+            run_pending()
+
+        failed = Task.objects.get()
+        self.assertEqual(failed.status, 'FLD')
+        self.assertEqual(failed.attempts, 2)
+
+    def test_unknown_and_stale_tasks(self):
+        """Tests that unregistered names fail and abandoned tasks are requeued"""
+
+        enqueue('os.system', ['true'], max_attempts=1)
+
+        with self.assertLogs('tasks.queue', 'ERROR'):
+            run_pending()
+        self.assertEqual(Task.objects.get().status, 'FLD')
+
+        record.delay(1)
+        claim()
+        Task.objects.filter(status='RUN').update(locked_at=timezone.now() - datetime.timedelta(minutes=5))
+
+        self.assertEqual(requeue_stale(), 1)
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(calls, [1])
+
+    def test_stale_task_attempts(self):
+        """Tests that a task abandoned on every attempt is failed instead of requeued forever"""
+
+        record.delay(1)
+
+        for attempt in range(5):
+            claim()
+            Task.objects.filter(status='RUN').update(locked_at=timezone.now() - datetime.timedelta(minutes=5))
+
+            if attempt < 4:
+                self.assertEqual(requeue_stale(), 1)
+
+        with self.assertLogs('tasks.queue', 'ERROR'):
+            self.assertEqual(requeue_stale(), 0)
+
+        task = Task.objects.get()
+        self.assertEqual((task.status, task.attempts, task.locked_at), ('FLD', 5, None))
+        self.assertEqual(run_pending(), 0)
+        self.assertEqual(calls, [])
+
+    def test_run_tasks_command(self):
+        """Tests that the worker runs the queue and purges old finished tasks"""
+
+        record.delay(1)
+        call_command('run_tasks', '--once', stdout=StringIO())
+        Task.objects.update(created_at=timezone.now() - datetime.timedelta(days=8))
+
+        call_command('run_tasks', '--once', stdout=StringIO())
+
+        self.assertEqual(calls, [1])
+        self.assertFalse(Task.objects.exists())
+
+    def test_purchases_counter(self):
+        """Tests that orders count the purchase of their user in the background"""
+
+        from carts.models import Order
+
+        user = User.objects.create(email='user@test.com', password='T@st123')
+        Order.objects.create(cart=user.cart_set.get())
+
+        self.assertEqual(User.objects.get(pk=user.pk).purchases, 0)
+
+        run_pending()
+
+        self.assertEqual(User.objects.get(pk=user.pk).purchases, 1)
@@ -25,13 +25,13 @@ class UserAdmin(admin.ModelAdmin):
         'email',
     )
 
-    readonly_fields = ('email', 'purchases', 'cart_count')
+    readonly_fields = ('email', 'purchases')
 
     fieldsets = [
         (
             None,
             {
-                'fields': ['email', 'purchases', 'cart_count', 'date_joined'],
+                'fields': ['email', 'purchases', 'date_joined'],
             },
         ),
         (
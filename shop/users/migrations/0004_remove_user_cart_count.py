@@ -0,0 +1,17 @@
+# Generated by Django 5.0 on 2026-10-18 08:23
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_cart_count'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='user',
+            name='cart_count',
+        ),
+    ]
@@ -0,0 +1,11 @@
+from django.db.models import F
+
+from tasks.queue import task
+from users.models import User
+
+
+@task
+def count_purchase(user_pk):
+    """Adds an order to the purchases shown on the profile of a user"""
+
+    User.objects.filter(pk=user_pk).update(purchases=F('purchases') + 1)